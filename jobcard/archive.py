@@ -0,0 +1,112 @@
+"""Moving closed job cards out of the hot table, for `manage.py archive_jobcards`.
+
+A job card is archived once every item is in a terminal status and it has
+not changed for JOBCARD_ARCHIVE_AFTER_DAYS. Its row, images and status
+history are copied into ArchivedJobCard (partitioned by year of
+created_at), its image files into cold_storage, and the hot rows are then
+deleted with delete_with_files(), so the list page, its indexes and the
+change feed only deal with active work.
+"""
+import logging
+from datetime import timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.utils import timezone
+
+from .models import ARCHIVE_JOBCARDS_SQL, IMAGE_FILE_FIELDS, ArchivedJobCard, JobCard, JobCardImage
+from .storage import blob_storage, cold_storage
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_AFTER_DAYS = 365
+# worst_status only reaches these once no item is still open
+TERMINAL_STATUSES = ('rejected', 'returned', 'completed')
+
+
+def get_archive_cutoff(days=None):
+    if days is None:
+        days = getattr(settings, 'JOBCARD_ARCHIVE_AFTER_DAYS', ARCHIVE_AFTER_DAYS)
+    return timezone.now() - timedelta(days=days)
+
+
+def archivable_jobcards(cutoff):
+    """Job cards with only closed items and no change since cutoff"""
+    return JobCard.objects.filter(worst_status__in=TERMINAL_STATUSES, updated_at__lt=cutoff)
+
+
+def partition_name(year):
+    return f"{ArchivedJobCard._meta.db_table}_y{year}"
+
+
+def ensure_partitions(years, using=DEFAULT_DB_ALIAS):
+    """Create the yearly archive partitions (UTC years) that do not exist yet"""
+    connection = connections[using]
+    table = ArchivedJobCard._meta.db_table
+    with connection.cursor() as cursor:
+        missing = []
+        for year in sorted(years):
+            cursor.execute("SELECT to_regclass(%s)", [partition_name(year)])
+            if cursor.fetchone()[0] is None:
+                missing.append(year)
+        if not missing:
+            return
+        # Concurrent archivers would otherwise race on CREATE TABLE
+        cursor.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", [table])
+        for year in missing:
+            cursor.execute(
+                f"CREATE TABLE IF NOT EXISTS {connection.ops.quote_name(partition_name(year))} "
+                f"PARTITION OF {connection.ops.quote_name(table)} "
+                f"FOR VALUES FROM ('{year:04d}-01-01 00:00:00+00') TO ('{year + 1:04d}-01-01 00:00:00+00')"
+            )
+
+
+def copy_to_cold_storage(names):
+    """Copy hot blobs to cold_storage under the same names; returns the names that were missing"""
+    missing = set()
+    for name in sorted(names):
+        if cold_storage.exists(name):
+            continue
+        try:
+            with blob_storage.open(name) as content:
+                cold_storage.restore(name, content)
+        except FileNotFoundError:
+            logger.warning("Image file %s is missing, archiving without it", name)
+            missing.add(name)
+    return missing
+
+
+def archive_batch(cutoff, batch_size, using=DEFAULT_DB_ALIAS):
+    """Archive up to batch_size job cards idle since cutoff; returns how many were archived.
+
+    The job cards are locked with SKIP LOCKED, so concurrent archivers and
+    editors do not wait on each other, and rechecked by the locking query.
+    Files reach cold storage before the hot rows are deleted; should the
+    transaction roll back, the cold copies are simply reused next time.
+    """
+    with transaction.atomic(using=using):
+        rows = list(
+            archivable_jobcards(cutoff).using(using)
+            .select_for_update(skip_locked=True)
+            .order_by('updated_at', 'pk')
+            .values_list('pk', 'created_at')[:batch_size]
+        )
+        if not rows:
+            return 0
+        pks = [pk for pk, _ in rows]
+
+        names = {
+            name
+            for file_names in JobCardImage.objects.using(using).filter(jobcard_id__in=pks)
+            .values_list(*IMAGE_FILE_FIELDS)
+            for name in file_names if name
+        }
+        # Keeps a concurrent sweep from unlinking the blobs while they are copied
+        JobCardImage.objects.using(using).lock_files(names)
+        copy_to_cold_storage(names)
+
+        ensure_partitions({created_at.astimezone(dt_timezone.utc).year for _, created_at in rows}, using)
+        with connections[using].cursor() as cursor:
+            cursor.execute(ARCHIVE_JOBCARDS_SQL, [pks])
+        JobCard.objects.using(using).filter(pk__in=pks).delete_with_files()
+    return len(pks)
@@ -0,0 +1,70 @@
+"""Cached JSON payloads for the job card detail API.
+
+A payload is stored under the job card's version (its updated_at in
+microseconds), and a short-lived pointer records the current version so a
+conditional GET can be answered with 304 without querying the database.
+Writers drop the pointer once their transaction commits; anything that
+changes what the detail API returns must bump updated_at or call
+forget_jobcard_details().
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+DETAIL_CACHE_TIMEOUT = 60 * 60
+# Bounds how long a pointer written by a request racing a commit can stay stale
+VERSION_CACHE_TIMEOUT = 60
+
+
+def get_timeouts():
+    return (
+        getattr(settings, 'JOBCARD_DETAIL_CACHE_TIMEOUT', DETAIL_CACHE_TIMEOUT),
+        getattr(settings, 'JOBCARD_VERSION_CACHE_TIMEOUT', VERSION_CACHE_TIMEOUT),
+    )
+
+
+def version_key(pk):
+    return f'jobcard:detail-version:{pk}'
+
+
+def detail_key(pk, version):
+    return f'jobcard:detail:{pk}:{version}'
+
+
+def jobcard_version(jobcard):
+    return int(jobcard.updated_at.timestamp() * 1_000_000)
+
+
+def get_cached_version(pk):
+    return cache.get(version_key(pk))
+
+
+def get_cached_detail(pk, version):
+    return cache.get(detail_key(pk, version))
+
+
+def store_detail(pk, version, payload):
+    detail_timeout, version_timeout = get_timeouts()
+    cache.set(detail_key(pk, version), payload, detail_timeout)
+    cache.set(version_key(pk), version, version_timeout)
+
+
+async def aget_cached_version(pk):
+    return await cache.aget(version_key(pk))
+
+
+async def aget_cached_detail(pk, version):
+    return await cache.aget(detail_key(pk, version))
+
+
+async def astore_detail(pk, version, payload):
+    detail_timeout, version_timeout = get_timeouts()
+    await cache.aset(detail_key(pk, version), payload, detail_timeout)
+    await cache.aset(version_key(pk), version, version_timeout)
+
+
+def forget_jobcard_details(pks, using=DEFAULT_DB_ALIAS):
+    """Drop the version pointers of pks once the current transaction commits"""
+    keys = [version_key(pk) for pk in pks if pk is not None]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys), using=using)
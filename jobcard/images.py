@@ -0,0 +1,50 @@
+import io
+import logging
+import os
+
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# Bounding boxes for the generated variants. Thumbnails cover the list
+# page's gallery tiles and the edit page's 70px previews.
+THUMBNAIL_SIZE = (240, 240)
+MEDIUM_SIZE = (1280, 1280)
+VARIANT_QUALITY = 80
+
+
+def render_variant(image_file, size):
+    """Return a JPEG ContentFile of image_file scaled to fit within size, or None if it cannot be read"""
+    try:
+        image_file.open('rb')
+        image_file.seek(0)
+        with Image.open(image_file) as source:
+            picture = ImageOps.exif_transpose(source)
+            picture.thumbnail(size, Image.Resampling.LANCZOS)
+            if picture.mode not in ('RGB', 'L'):
+                picture = picture.convert('RGB')
+            buffer = io.BytesIO()
+            picture.save(buffer, format='JPEG', quality=VARIANT_QUALITY, optimize=True)
+    except (OSError, ValueError, Image.DecompressionBombError) as e:
+        logger.warning("Could not create %s variant of %s: %s", size, image_file.name, e)
+        return None
+    finally:
+        image_file.close()
+    return ContentFile(buffer.getvalue())
+
+
+def variant_name(original_name):
+    """thumbnail/medium files keep the original's base name with a .jpg extension"""
+    base, _ = os.path.splitext(os.path.basename(original_name))
+    return f"{base}.jpg"
+
+
+def is_valid_image(path):
+    """True if Pillow can identify the file at path as an image"""
+    try:
+        with Image.open(path) as picture:
+            picture.verify()
+    except (OSError, ValueError, SyntaxError, Image.DecompressionBombError):
+        return False
+    return True
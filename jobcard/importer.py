@@ -0,0 +1,156 @@
+"""Readers and validation for `manage.py import_jobcards`.
+
+CSV input uses the export's columns (one line per item complaint, lines of
+one ticket next to each other); JSON Lines input has one job card per line:
+
+    {"ticket_no": "", "customer": "", "phone": "", "address": "", "created_at": "",
+     "items": [{"item": "", "serial": "", "config": "", "status": "",
+                "complaints": [{"description": "", "notes": ""}]}]}
+
+ticket_no and created_at are optional.
+"""
+import csv
+import json
+from datetime import datetime
+
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import JobCard
+
+CSV_COLUMNS = {
+    'Ticket No': 'ticket_no',
+    'Created Date': 'created_at',
+    'Customer Name': 'customer',
+    'Phone No': 'phone',
+    'Address': 'address',
+    'Item': 'item',
+    'Serial': 'serial',
+    'Configuration': 'config',
+    'Status': 'status',
+    'Complaint': 'complaint',
+    'Notes': 'notes',
+}
+CSV_DATE_FORMATS = ('%d/%m/%Y %H:%M', '%d/%m/%Y')
+TICKET_FIELDS = ('ticket_no', 'created_at', 'customer', 'phone', 'address')
+ITEM_FIELDS = ('item', 'serial', 'config', 'status')
+
+
+def iter_csv_records(file):
+    """Yield (line_number, record) per ticket from consecutive CSV lines sharing the ticket columns"""
+    reader = csv.DictReader(file)
+    missing = {'Customer Name', 'Phone No', 'Item'}.difference(reader.fieldnames or [])
+    if missing:
+        raise ValueError(f"Missing CSV columns: {', '.join(sorted(missing))}")
+
+    record = ticket_key = None
+    line_number = 0
+    for row in reader:
+        row = {field: (row.get(column) or '').strip() for column, field in CSV_COLUMNS.items()}
+        key = tuple(row[field] for field in TICKET_FIELDS)
+        if key != ticket_key:
+            if record is not None:
+                yield line_number, record
+            ticket_key = key
+            line_number = reader.line_num
+            record = {field: row[field] for field in TICKET_FIELDS}
+            record['items'] = []
+
+        item_key = {field: row[field] for field in ITEM_FIELDS}
+        items = record['items']
+        if not items or {field: items[-1][field] for field in ITEM_FIELDS} != item_key:
+            items.append({**item_key, 'complaints': []})
+        if row['complaint']:
+            # The export writes complaints as "<item>: <description>"
+            description = row['complaint'].removeprefix(f"{row['item'] or 'Unknown'}: ")
+            items[-1]['complaints'].append({'description': description, 'notes': row['notes']})
+    if record is not None:
+        yield line_number, record
+
+
+def iter_jsonl_records(file):
+    """Yield (line_number, record) per non-blank line; records that are not JSON objects are yielded as the error text"""
+    for line_number, line in enumerate(file, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            record = f"Invalid JSON: {e}"
+        yield line_number, record
+
+
+def parse_created_at(value):
+    if not value:
+        return None
+    created_at = parse_datetime(value)
+    if created_at is None:
+        for date_format in CSV_DATE_FORMATS:
+            try:
+                created_at = datetime.strptime(value, date_format)
+                break
+            except ValueError:
+                continue
+    if created_at is None:
+        raise ValueError(f"Invalid created date: {value}")
+    if timezone.is_naive(created_at):
+        created_at = timezone.make_aware(created_at)
+    return created_at
+
+
+def text(value, field, max_length=None, required=False):
+    value = '' if value is None else str(value).strip()
+    if required and not value:
+        raise ValueError(f"{field} is required")
+    if max_length and len(value) > max_length:
+        raise ValueError(f"{field} is longer than {max_length} characters")
+    return value
+
+
+def build_items_data(items):
+    """items_data in the structure the create form produces; ValueError on invalid input"""
+    if not isinstance(items, list) or not items:
+        raise ValueError("At least one item is required")
+    statuses = {value: value for value, _ in JobCard.STATUS_CHOICES}
+    statuses.update({label.lower(): value for value, label in JobCard.STATUS_CHOICES})
+
+    items_data = []
+    for position, item in enumerate(items, start=1):
+        if not isinstance(item, dict):
+            raise ValueError(f"Item {position} must be an object")
+        status = text(item.get('status'), 'status') or 'logged'
+        status_value = statuses.get(status) or statuses.get(status.lower())
+        if status_value is None:
+            raise ValueError(f"Item {position} has an invalid status: {status}")
+        complaints = item.get('complaints') or []
+        if not isinstance(complaints, list):
+            raise ValueError(f"Item {position} complaints must be a list")
+        items_data.append({
+            'item': text(item.get('item'), f"Item {position} name", 100, required=True),
+            'serial': text(item.get('serial'), f"Item {position} serial", 100),
+            'config': text(item.get('config'), f"Item {position} configuration"),
+            'status': status_value,
+            'complaints': [
+                {
+                    'description': text(complaint.get('description'), 'complaint'),
+                    'notes': text(complaint.get('notes'), 'notes'),
+                }
+                for complaint in complaints
+                if isinstance(complaint, dict) and text(complaint.get('description'), 'complaint')
+            ],
+        })
+    return items_data
+
+
+def build_jobcard(record):
+    """Unsaved JobCard for one input record; ValueError describing the first problem"""
+    if not isinstance(record, dict):
+        raise ValueError(record if isinstance(record, str) else "Record must be an object")
+    return JobCard(
+        ticket_no=text(record.get('ticket_no'), 'ticket_no', 20),
+        customer=text(record.get('customer'), 'customer', 100, required=True),
+        phone=text(record.get('phone'), 'phone', 15, required=True),
+        address=text(record.get('address'), 'address'),
+        items_data=build_items_data(record.get('items')),
+        created_at=parse_created_at(text(record.get('created_at'), 'created_at')),
+    )
@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from jobcard.archive import archivable_jobcards, archive_batch, get_archive_cutoff
+
+
+class Command(BaseCommand):
+    help = (
+        "Move job cards whose items are all completed, returned or rejected and that have not changed "
+        "for --older-than-days into the partitioned archive, with their images in cold storage."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than-days', type=int,
+                            help="Defaults to the JOBCARD_ARCHIVE_AFTER_DAYS setting (365)")
+        parser.add_argument('--batch-size', type=int, default=200, help="Job cards moved per transaction")
+        parser.add_argument('--dry-run', action='store_true', help="Only count the job cards to archive")
+
+    def handle(self, *args, **options):
+        cutoff = get_archive_cutoff(options['older_than_days'])
+        if options['dry_run']:
+            count = archivable_jobcards(cutoff).count()
+            self.stdout.write(f"{count} job card(s) not changed since {cutoff:%Y-%m-%d} would be archived.")
+            return
+
+        batch_size = max(1, options['batch_size'])
+        started = time.monotonic()
+        archived = 0
+        while True:
+            moved = archive_batch(cutoff, batch_size)
+            if not moved:
+                break
+            archived += moved
+            self.stdout.write(f"Archived {archived} job card(s)")
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {archived} job card(s) not changed since {cutoff:%Y-%m-%d} "
+            f"in {elapsed:.1f}s ({archived / max(elapsed, 1e-6):.0f}/s)."
+        ))
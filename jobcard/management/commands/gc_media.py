@@ -0,0 +1,220 @@
+import os
+import re
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Case, CharField, Value, When
+
+from jobcard.models import IMAGE_FILE_FIELDS, FileTombstone, JobCardImage
+from jobcard.storage import blob_storage
+
+# Top-level media directories holding job card image files (variants live below jobcard_images/)
+IMAGE_DIRECTORIES = ('jobcard_images',)
+# <upload_to>/<first two hex digits>/<sha256><extension>, as written by ContentAddressedStorage
+CONTENT_ADDRESS = re.compile(r'(?:^|/)([0-9a-f]{2})/\1[0-9a-f]{62}(?:\.\w*)?$')
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconcile the image files under MEDIA_ROOT with the JobCardImage table: remove files no row "
+        "references, and repair rows whose files are missing. Both sides are streamed in chunks. "
+        "With --rehash, files uploaded before content addressing are first merged into shared blobs."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Only report what would change")
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--min-age-minutes', type=int, default=60,
+                            help="Leave newer files alone; their rows may not be committed yet")
+        parser.add_argument('--rehash', action='store_true',
+                            help="First move files saved before content addressing into shared blobs, "
+                                 "repointing their rows, so duplicate uploads are stored once")
+
+    def handle(self, *args, **options):
+        self.dry_run = options['dry_run']
+        self.chunk_size = max(1, options['chunk_size'])
+        self.cutoff = time.time() - timedelta(minutes=options['min_age_minutes']).total_seconds()
+
+        if options['rehash']:
+            started = time.monotonic()
+            legacy = self.rehash_legacy_files()
+            elapsed = time.monotonic() - started
+            self.stdout.write(
+                f"Found {legacy} file(s) saved before content addressing in {elapsed:.1f}s"
+                + (" (dry run, kept)" if self.dry_run else ", moved into shared blobs")
+            )
+
+        started = time.monotonic()
+        scanned, orphans, orphan_bytes = self.collect_orphan_files()
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            f"Scanned {scanned} file(s) in {elapsed:.1f}s ({scanned / max(elapsed, 1e-6):.0f}/s): "
+            f"{orphans} unreferenced, {orphan_bytes / 1024 / 1024:.1f} MiB"
+            + (" (dry run, kept)" if self.dry_run else " removed")
+        )
+
+        started = time.monotonic()
+        rows, missing_originals, missing_variants = self.repair_missing_files()
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            f"Checked {rows} image row(s) in {elapsed:.1f}s ({rows / max(elapsed, 1e-6):.0f}/s): "
+            f"{missing_originals} without their image file"
+            + (" (dry run, kept)" if self.dry_run else " deleted")
+            + f", {missing_variants} with missing variants"
+            + ("" if self.dry_run else " queued for regeneration")
+        )
+        self.stdout.write(self.style.SUCCESS("Media reconciliation finished."))
+
+    def iter_files(self, directory):
+        """Yield (name relative to MEDIA_ROOT, size) for files older than the cutoff, walking with os.scandir"""
+        pending = [directory]
+        while pending:
+            current = pending.pop()
+            try:
+                entries = os.scandir(blob_storage.path(current))
+            except FileNotFoundError:
+                continue
+            with entries:
+                for entry in entries:
+                    name = f"{current}/{entry.name}"
+                    if entry.is_dir(follow_symlinks=False):
+                        pending.append(name)
+                    elif entry.is_file(follow_symlinks=False):
+                        stat = entry.stat(follow_symlinks=False)
+                        if stat.st_mtime < self.cutoff:
+                            yield name, stat.st_size
+
+    def collect_orphan_files(self):
+        scanned = orphans = orphan_bytes = 0
+        chunk = {}
+        for directory in IMAGE_DIRECTORIES:
+            for name, size in self.iter_files(directory):
+                scanned += 1
+                chunk[name] = size
+                if len(chunk) >= self.chunk_size:
+                    found, found_bytes = self.remove_unreferenced(chunk)
+                    orphans += found
+                    orphan_bytes += found_bytes
+                    chunk = {}
+        if chunk:
+            found, found_bytes = self.remove_unreferenced(chunk)
+            orphans += found
+            orphan_bytes += found_bytes
+        return scanned, orphans, orphan_bytes
+
+    def remove_unreferenced(self, sizes):
+        unreferenced = set(sizes) - JobCardImage.objects.referenced_files(sizes)
+        for name in sorted(unreferenced):
+            self.stdout.write(f"Unreferenced file: {name}", style_func=self.style.WARNING)
+        if unreferenced and not self.dry_run:
+            # Rechecks references under the blob locks, so a concurrent upload keeps its file
+            unreferenced = JobCardImage.objects.release_files(unreferenced)
+        return len(unreferenced), sum(sizes[name] for name in unreferenced)
+
+    def rehash_legacy_files(self):
+        legacy = 0
+        chunk = []
+        images = JobCardImage.objects.values_list(*IMAGE_FILE_FIELDS).order_by()
+        for names in images.iterator(chunk_size=self.chunk_size):
+            chunk.extend(
+                (field_name, name) for field_name, name in zip(IMAGE_FILE_FIELDS, names)
+                if name and not CONTENT_ADDRESS.search(name)
+            )
+            if len(chunk) >= self.chunk_size:
+                legacy += self.rehash_chunk(chunk)
+                chunk = []
+        if chunk:
+            legacy += self.rehash_chunk(chunk)
+        return legacy
+
+    def rehash_chunk(self, legacy):
+        """Store the legacy files under their content address, then repoint rows with one UPDATE per field"""
+        from jobcard.tasks import enqueue
+
+        legacy = {
+            (field_name, name) for field_name, name in legacy
+            # Rows whose file is gone are left to the repair pass
+            if os.path.exists(blob_storage.path(name))
+        }
+        if self.dry_run or not legacy:
+            return len(legacy)
+        addresses = {}
+        for field_name, name in sorted(legacy):
+            upload_to = JobCardImage._meta.get_field(field_name).upload_to
+            with blob_storage.open(name) as content:
+                addresses[field_name, name] = blob_storage.save(os.path.join(upload_to, os.path.basename(name)), content)
+
+        with transaction.atomic():
+            JobCardImage.objects.lock_files({name for _, name in legacy} | set(addresses.values()))
+            for (_, name), address in addresses.items():
+                # A blob this deduplicated against may have been released meanwhile
+                if not blob_storage.exists(address):
+                    with blob_storage.open(name) as content:
+                        blob_storage.restore(address, content)
+            for field_name in IMAGE_FILE_FIELDS:
+                moves = {name: address for (field, name), address in addresses.items() if field == field_name}
+                if moves:
+                    JobCardImage.objects.filter(**{f'{field_name}__in': moves}).update(**{field_name: Case(
+                        *(When(**{field_name: name}, then=Value(address)) for name, address in moves.items()),
+                        default=field_name, output_field=CharField(),
+                    )})
+            FileTombstone.objects.bulk_create(FileTombstone(name=name) for _, name in addresses)
+            enqueue('sweep_file_tombstones')
+        return len(legacy)
+
+    def repair_missing_files(self):
+        rows = missing_originals = missing_variants = 0
+        chunk = []
+        images = JobCardImage.objects.values_list('pk', *IMAGE_FILE_FIELDS).order_by()
+        for row in images.iterator(chunk_size=self.chunk_size):
+            rows += 1
+            chunk.append(row)
+            if len(chunk) >= self.chunk_size:
+                originals, variants = self.repair_chunk(chunk)
+                missing_originals += originals
+                missing_variants += variants
+                chunk = []
+        if chunk:
+            originals, variants = self.repair_chunk(chunk)
+            missing_originals += originals
+            missing_variants += variants
+        return rows, missing_originals, missing_variants
+
+    def repair_chunk(self, rows):
+        """Delete the rows without an original and clear missing variants, one statement per kind of repair"""
+        broken = []
+        variants = []
+        cleared = {field_name: set() for field_name in IMAGE_FILE_FIELDS}
+        for pk, *names in rows:
+            missing = {
+                field_name: name for field_name, name in zip(IMAGE_FILE_FIELDS, names)
+                if name and not os.path.exists(blob_storage.path(name))
+            }
+            if not missing:
+                continue
+            self.stdout.write(f"Image {pk} is missing: {', '.join(missing)}", style_func=self.style.WARNING)
+            if 'image' in missing:
+                broken.append(pk)
+            else:
+                variants.append(pk)
+                for field_name, name in missing.items():
+                    cleared[field_name].add(name)
+        if not self.dry_run:
+            self.apply_repairs(broken, variants, cleared)
+        return len(broken), len(variants)
+
+    def apply_repairs(self, broken, variants, cleared):
+        from jobcard.tasks import enqueue
+
+        if broken:
+            JobCardImage.objects.filter(pk__in=broken).delete_with_files()
+        if variants:
+            for field_name, names in cleared.items():
+                if names:
+                    # Only clear a variant that still points at a missing file
+                    JobCardImage.objects.filter(
+                        pk__in=variants, **{f'{field_name}__in': names},
+                    ).update(**{field_name: ''})
+            enqueue('generate_image_variants', image_ids=variants)
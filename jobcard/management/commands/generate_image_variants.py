@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from jobcard.models import JobCardImage
+
+
+class Command(BaseCommand):
+    help = "Create missing thumbnail/medium variants for existing job card images"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=200)
+
+    def handle(self, *args, **options):
+        images = JobCardImage.objects.filter(Q(thumbnail='') | Q(medium='')).exclude(image='')
+        created = failed = 0
+        for image in images.iterator(chunk_size=options['chunk_size']):
+            if image.generate_variants():
+                created += 1
+            else:
+                failed += 1
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated variants for {created} image(s); {failed} could not be processed."
+        ))
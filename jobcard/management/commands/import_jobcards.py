@@ -0,0 +1,121 @@
+import csv
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from jobcard.importer import build_jobcard, iter_csv_records, iter_jsonl_records
+from jobcard.models import ArchivedJobCard, ImportCheckpoint, JobCard
+from jobcard.tickets import TicketNumberBlock, advance_ticket_sequence
+
+READERS = {
+    'csv': iter_csv_records,
+    'jsonl': iter_jsonl_records,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Import job cards from CSV (the export's columns) or JSON Lines. Progress is committed "
+        "with every batch, so running the command again resumes after the last imported batch."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=sorted(READERS), help="Defaults to the file extension")
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--ticket-block-size', type=int, default=1000,
+                            help="Ticket numbers reserved per sequence round-trip")
+        parser.add_argument('--source', help="Checkpoint name (defaults to the absolute path)")
+        parser.add_argument('--restart', action='store_true', help="Ignore the checkpoint and start over")
+        parser.add_argument('--errors', help="Append rejected records to this CSV file")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or os.path.splitext(path)[1].lstrip('.').lower()
+        if file_format not in READERS:
+            raise CommandError(f"Unknown format {file_format!r}; use --format csv or --format jsonl")
+        if not os.path.exists(path):
+            raise CommandError(f"{path} does not exist")
+
+        self.batch_size = max(1, options['batch_size'])
+        self.tickets = TicketNumberBlock(block_size=max(1, options['ticket_block_size']))
+        self.checkpoint, _ = ImportCheckpoint.objects.get_or_create(source=options['source'] or os.path.abspath(path))
+        if options['restart']:
+            self.checkpoint.position = self.checkpoint.imported = self.checkpoint.failed = 0
+            self.checkpoint.save()
+        elif self.checkpoint.position:
+            self.stdout.write(f"Resuming after record {self.checkpoint.position}")
+        self.errors_file = open(options['errors'], 'a', newline='') if options['errors'] else None
+        self.started = time.monotonic()
+        self.imported = 0
+
+        try:
+            with open(path, newline='', encoding='utf-8-sig') as file:
+                self.import_records(READERS[file_format](file))
+        except ValueError as e:
+            raise CommandError(str(e))
+        finally:
+            if self.errors_file:
+                self.errors_file.close()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {self.imported} job card(s) in {time.monotonic() - self.started:.1f}s "
+            f"({self.rate():.0f}/s); {self.checkpoint.imported} imported and "
+            f"{self.checkpoint.failed} rejected from this source in total."
+        ))
+
+    def import_records(self, records):
+        batch = []
+        failures = []
+        position = self.checkpoint.position
+        for index, (line_number, record) in enumerate(records, start=1):
+            if index <= self.checkpoint.position:
+                continue
+            position = index
+            try:
+                batch.append((line_number, build_jobcard(record)))
+            except ValueError as e:
+                failures.append((line_number, str(e)))
+            if len(batch) >= self.batch_size:
+                self.flush(batch, failures, position)
+                batch, failures = [], []
+        if batch or failures or position != self.checkpoint.position:
+            self.flush(batch, failures, position)
+
+    def flush(self, batch, failures, position):
+        """Insert one batch and move the checkpoint past it in the same transaction"""
+        wanted = [jobcard.ticket_no for _, jobcard in batch if jobcard.ticket_no]
+        if advance_ticket_sequence(wanted):
+            # Numbers still held from an earlier block could be among the imported ones
+            self.tickets = TicketNumberBlock(block_size=self.tickets.block_size)
+        taken = set(JobCard.objects.filter(ticket_no__in=wanted).values_list('ticket_no', flat=True))
+        taken.update(ArchivedJobCard.objects.filter(ticket_no__in=wanted).values_list('ticket_no', flat=True))
+        jobcards = []
+        for line_number, jobcard in batch:
+            if jobcard.ticket_no in taken:
+                failures.append((line_number, f"Ticket {jobcard.ticket_no} already exists"))
+                continue
+            if jobcard.ticket_no:
+                taken.add(jobcard.ticket_no)
+            else:
+                jobcard.ticket_no = next(self.tickets)
+            jobcards.append(jobcard)
+
+        with transaction.atomic():
+            JobCard.objects.bulk_create_with_items(jobcards, batch_size=self.batch_size)
+            self.checkpoint.position = position
+            self.checkpoint.imported += len(jobcards)
+            self.checkpoint.failed += len(failures)
+            self.checkpoint.save()
+
+        self.imported += len(jobcards)
+        for line_number, message in sorted(failures):
+            self.stderr.write(f"Line {line_number}: {message}")
+            if self.errors_file:
+                csv.writer(self.errors_file).writerow([line_number, message])
+        self.stdout.write(f"Imported {self.imported} job card(s) ({self.rate():.0f}/s)")
+
+    def rate(self):
+        return self.imported / max(time.monotonic() - self.started, 1e-6)
@@ -0,0 +1,24 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from jobcard.models import ImageUpload, JobCardImage
+
+
+class Command(BaseCommand):
+    help = "Remove abandoned chunked uploads and uploaded images never attached to a job card"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than-hours', type=int, default=24)
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=options['older_than_hours'])
+        partial = 0
+        for upload in ImageUpload.objects.filter(image__isnull=True, updated_at__lt=cutoff).iterator():
+            upload.discard()
+            partial += 1
+        orphans = JobCardImage.objects.filter(jobcard__isnull=True, uploaded_at__lt=cutoff).delete_with_files()
+        self.stdout.write(self.style.SUCCESS(
+            f"Removed {partial} unfinished upload(s) and {orphans} unattached image(s)."
+        ))
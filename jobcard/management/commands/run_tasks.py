@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from jobcard import tasks
+
+
+class Command(BaseCommand):
+    help = "Run queued background tasks (image variants, file deletion)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Drain the queue once and exit")
+        parser.add_argument('--interval', type=float, default=2.0, help="Seconds to sleep when the queue is empty")
+
+    def handle(self, *args, **options):
+        while True:
+            requeued = tasks.requeue_stale_tasks()
+            if requeued:
+                self.stdout.write(f"Requeued {requeued} stale task(s)")
+            succeeded, failed = tasks.run_pending()
+            if succeeded or failed:
+                self.stdout.write(f"Ran {succeeded} task(s), {failed} failed")
+            if options['once']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,155 @@
+"""Per-request timings collected by jobcard.middleware.PerformanceMiddleware.
+
+Samples are kept per URL name in a bounded window in process memory, so the
+figures served by the metrics API describe the last requests handled by
+this worker process and start over on restart.
+"""
+import contextvars
+import functools
+import math
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+from django.db import connections
+from django.template.base import Template
+
+METRICS_WINDOW = 500
+PERCENTILES = (50, 90, 99)
+SAMPLE_FIELDS = ('wall_ms', 'db_ms', 'queries', 'template_ms', 'response_bytes')
+
+# The RequestMetrics of the request being handled; copied into sync_to_async threads
+current_metrics = contextvars.ContextVar('jobcard_request_metrics', default=None)
+
+
+class RequestMetrics:
+    """Counters for one request; doubles as the execute_wrapper that times its queries"""
+
+    def __init__(self, time_templates=False):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        # None when template rendering is not timed (see instrument_templates)
+        self.template_time = 0.0 if time_templates else None
+        self.template_depth = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db_time += time.perf_counter() - started
+
+    def observe_queries(self, stack):
+        """Install self as execute_wrapper on every connection of the calling thread until stack closes"""
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(self))
+        return stack
+
+    def sample(self, response):
+        return {
+            'wall_ms': (time.perf_counter() - self.started) * 1000,
+            'db_ms': self.db_time * 1000,
+            'queries': self.queries,
+            'template_ms': None if self.template_time is None else self.template_time * 1000,
+            # Streaming responses (the CSV export) are not buffered, so their size is unknown here
+            'response_bytes': None if response.streaming else len(response.content),
+        }
+
+
+def instrument_templates():
+    """Time Template.render for the active request; nested renders ({% include %}) count once.
+
+    Patches Template.render for the whole process, so PerformanceMiddleware
+    only calls it when JOBCARD_METRICS_TEMPLATES is on.
+    """
+    if getattr(Template.render, 'instrumented', False):
+        return
+    render = Template.render
+
+    @functools.wraps(render)
+    def timed_render(self, context):
+        metrics = current_metrics.get()
+        if metrics is None or metrics.template_time is None or metrics.template_depth:
+            return render(self, context)
+        metrics.template_depth += 1
+        started = time.perf_counter()
+        try:
+            return render(self, context)
+        finally:
+            metrics.template_depth -= 1
+            metrics.template_time += time.perf_counter() - started
+
+    timed_render.instrumented = True
+    Template.render = timed_render
+
+
+def restore_templates():
+    """Undo instrument_templates()"""
+    if getattr(Template.render, 'instrumented', False):
+        Template.render = Template.render.__wrapped__
+
+
+def percentile(ordered, pct):
+    """Nearest-rank percentile of an ascending list"""
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+class MetricsStore:
+    """The last window samples per URL name, safe to share between request threads"""
+
+    def __init__(self, window=None):
+        self.window = window
+        self.lock = threading.Lock()
+        self.samples = {}
+
+    def get_window(self):
+        return self.window or getattr(settings, 'JOBCARD_METRICS_WINDOW', METRICS_WINDOW)
+
+    def record(self, name, sample):
+        with self.lock:
+            samples = self.samples.get(name)
+            if samples is None:
+                samples = self.samples[name] = deque(maxlen=self.get_window())
+            samples.append(sample)
+
+    def summary(self):
+        """{url_name: {'count', field: {'p50', 'p90', 'p99', 'max'}}} over the current window"""
+        with self.lock:
+            snapshot = {name: list(samples) for name, samples in self.samples.items()}
+        summary = {}
+        for name, samples in sorted(snapshot.items()):
+            summary[name] = {'count': len(samples)}
+            for field in SAMPLE_FIELDS:
+                values = sorted(sample[field] for sample in samples if sample[field] is not None)
+                if not values:
+                    summary[name][field] = None
+                    continue
+                figures = {f'p{pct}': percentile(values, pct) for pct in PERCENTILES}
+                figures['max'] = values[-1]
+                summary[name][field] = {
+                    key: round(value, 2) if isinstance(value, float) else value
+                    for key, value in figures.items()
+                }
+        return summary
+
+    def clear(self):
+        with self.lock:
+            self.samples.clear()
+
+
+store = MetricsStore()
+
+
+def server_timing(sample):
+    """Server-Timing header value, shown in the browser's network panel"""
+    timing = (
+        f'app;dur={sample["wall_ms"]:.1f}, '
+        f'db;dur={sample["db_ms"]:.1f};desc="{sample["queries"]} queries"'
+    )
+    if sample['template_ms'] is not None:
+        timing += f', tpl;dur={sample["template_ms"]:.1f}'
+    return timing
+
@@ -0,0 +1,62 @@
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+
+from .metrics import RequestMetrics, current_metrics, instrument_templates, server_timing, store
+
+
+class PerformanceMiddleware:
+    """Record wall time, query count, DB time, template time and response size per URL name.
+
+    Samples go to jobcard.metrics.store (served by api/metrics/). Template
+    time is only measured with JOBCARD_METRICS_TEMPLATES enabled. With
+    JOBCARD_METRICS_HEADER enabled every response also carries the request's
+    figures in a Server-Timing header.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        self.time_templates = getattr(settings, 'JOBCARD_METRICS_TEMPLATES', settings.DEBUG)
+        if self.time_templates:
+            instrument_templates()
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        metrics = RequestMetrics(self.time_templates)
+        token = current_metrics.set(metrics)
+        try:
+            with metrics.observe_queries(ExitStack()):
+                response = self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+        return self.finish(request, response, metrics)
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics(self.time_templates)
+        token = current_metrics.set(metrics)
+        # Connections are per thread: the ORM work of this request (async ORM
+        # calls and sync views alike) runs in its thread-sensitive executor
+        # thread, so the wrappers are installed and removed there
+        stack = await sync_to_async(metrics.observe_queries)(ExitStack())
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+            current_metrics.reset(token)
+        return self.finish(request, response, metrics)
+
+    def finish(self, request, response, metrics):
+        sample = metrics.sample(response)
+        match = request.resolver_match
+        if match is not None:
+            store.record(match.view_name, sample)
+        if getattr(settings, 'JOBCARD_METRICS_HEADER', False):
+            response['Server-Timing'] = server_timing(sample)
+        return response
@@ -0,0 +1,62 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:14
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobcard', '0009_alter_jobcardimage_options_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JobCardItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveIntegerField(help_text='Index of item in items_data array')),
+                ('item', models.CharField(max_length=100)),
+                ('serial', models.CharField(blank=True, max_length=100)),
+                ('config', models.TextField(blank=True)),
+                ('status', models.CharField(choices=[('logged', 'Logged'), ('sent_technician', 'Sent To Technician'), ('pending', 'Pending'), ('completed', 'Completed'), ('returned', 'Returned'), ('rejected', 'Rejected')], default='logged', max_length=20)),
+                ('jobcard', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='jobcard.jobcard')),
+            ],
+            options={
+                'ordering': ['jobcard', 'position'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Complaint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveIntegerField(help_text='Index of complaint within item')),
+                ('description', models.TextField()),
+                ('notes', models.TextField(blank=True)),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='complaints', to='jobcard.jobcarditem')),
+            ],
+            options={
+                'ordering': ['item', 'position'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='jobcarditem',
+            index=models.Index(fields=['status'], name='jobcarditem_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='jobcarditem',
+            index=models.Index(fields=['serial'], name='jobcarditem_serial_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='jobcarditem',
+            index=models.Index(fields=['item', 'status'], name='jobcarditem_item_status_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='jobcarditem',
+            constraint=models.UniqueConstraint(fields=('jobcard', 'position'), name='jobcarditem_unique_position'),
+        ),
+        migrations.AddConstraint(
+            model_name='complaint',
+            constraint=models.UniqueConstraint(fields=('item', 'position'), name='complaint_unique_position'),
+        ),
+    ]
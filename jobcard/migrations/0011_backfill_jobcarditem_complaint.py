@@ -0,0 +1,56 @@
+from django.db import migrations
+
+BATCH_SIZE = 500
+
+
+def backfill_items(apps, schema_editor):
+    JobCard = apps.get_model('jobcard', 'JobCard')
+    JobCardItem = apps.get_model('jobcard', 'JobCardItem')
+    Complaint = apps.get_model('jobcard', 'Complaint')
+
+    items = []
+    complaints = []
+
+    def flush():
+        JobCardItem.objects.bulk_create(items)
+        Complaint.objects.bulk_create(complaints)
+        items.clear()
+        complaints.clear()
+
+    jobcards = JobCard.objects.only('id', 'items_data').order_by('pk')
+    for jobcard in jobcards.iterator(chunk_size=BATCH_SIZE):
+        for position, item_data in enumerate(jobcard.items_data or []):
+            item = JobCardItem(
+                jobcard_id=jobcard.pk,
+                position=position,
+                item=(item_data.get('item') or '')[:100],
+                serial=(item_data.get('serial') or '')[:100],
+                config=item_data.get('config') or '',
+                status=item_data.get('status') or 'logged',
+            )
+            items.append(item)
+            for complaint_position, complaint in enumerate(item_data.get('complaints', [])):
+                complaints.append(Complaint(
+                    item=item,
+                    position=complaint_position,
+                    description=complaint.get('description') or '',
+                    notes=complaint.get('notes') or '',
+                ))
+        if len(items) >= BATCH_SIZE:
+            flush()
+    flush()
+
+
+def clear_items(apps, schema_editor):
+    apps.get_model('jobcard', 'JobCardItem').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobcard', '0010_jobcarditem_complaint'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_items, clear_items),
+    ]
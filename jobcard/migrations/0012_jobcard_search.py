@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:15
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+import django.db.models.expressions
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobcard', '0011_backfill_jobcarditem_complaint'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='jobcard',
+            name='search_vector',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.contrib.postgres.search.SearchVector('ticket_no', 'customer', 'phone', config='simple', weight='A'), '||', models.Func(models.Func(models.Value('simple'), models.Func(models.F('items_data'), models.Value('$[*].item'), function='jsonb_path_query_array'), models.Value('["string"]'), function='jsonb_to_tsvector'), models.Value('B'), function='setweight', output_field=django.contrib.postgres.search.SearchVectorField()), output_field=django.contrib.postgres.search.SearchVectorField()), '||', models.Func(models.Func(models.Value('simple'), models.Func(models.F('items_data'), models.Value('$[*].serial'), function='jsonb_path_query_array'), models.Value('["string"]'), function='jsonb_to_tsvector'), models.Value('B'), function='setweight', output_field=django.contrib.postgres.search.SearchVectorField()), output_field=django.contrib.postgres.search.SearchVectorField()), '||', models.Func(models.Func(models.Value('simple'), models.Func(models.F('items_data'), models.Value('$[*].complaints[*].description'), function='jsonb_path_query_array'), models.Value('["string"]'), function='jsonb_to_tsvector'), models.Value('C'), function='setweight', output_field=django.contrib.postgres.search.SearchVectorField()), output_field=django.contrib.postgres.search.SearchVectorField()), '||', django.contrib.postgres.search.SearchVector('address', config='simple', weight='D'), output_field=django.contrib.postgres.search.SearchVectorField()), output_field=django.contrib.postgres.search.SearchVectorField()),
+        ),
+        migrations.AddIndex(
+            model_name='jobcard',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='jobcard_search_vector_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='jobcard',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass('customer', name='gin_trgm_ops'), name='jobcard_customer_trgm_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='jobcard',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass('phone', name='gin_trgm_ops'), name='jobcard_phone_trgm_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='jobcard',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass('ticket_no', name='gin_trgm_ops'), name='jobcard_ticket_no_trgm_idx'),
+        ),
+    ]
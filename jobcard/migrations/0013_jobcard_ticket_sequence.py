@@ -0,0 +1,15 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobcard', '0012_jobcard_search'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            "CREATE SEQUENCE IF NOT EXISTS jobcard_ticket_seq START WITH 1",
+            "DROP SEQUENCE IF EXISTS jobcard_ticket_seq",
+        ),
+    ]
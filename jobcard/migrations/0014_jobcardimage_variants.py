@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobcard', '0013_jobcard_ticket_sequence'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='jobcardimage',
+            name='medium',
+            field=models.ImageField(blank=True, upload_to='jobcard_images/medium/'),
+        ),
+        migrations.AddField(
+            model_name='jobcardimage',
+            name='thumbnail',
+            field=models.ImageField(blank=True, upload_to='jobcard_images/thumbnails/'),
+        ),
+    ]
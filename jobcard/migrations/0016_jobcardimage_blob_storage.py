@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:23
+
+import jobcard.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobcard', '0015_backgroundtask'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='jobcardimage',
+            name='image',
+            field=models.ImageField(db_index=True, storage=jobcard.storage.ContentAddressedStorage(), upload_to='jobcard_images/'),
+        ),
+        migrations.AlterField(
+            model_name='jobcardimage',
+            name='medium',
+            field=models.ImageField(blank=True, db_index=True, storage=jobcard.storage.ContentAddressedStorage(), upload_to='jobcard_images/medium/'),
+        ),
+        migrations.AlterField(
+            model_name='jobcardimage',
+            name='thumbnail',
+            field=models.ImageField(blank=True, db_index=True, storage=jobcard.storage.ContentAddressedStorage(), upload_to='jobcard_images/thumbnails/'),
+        ),
+    ]
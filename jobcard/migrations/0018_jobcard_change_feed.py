@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobcard', '0017_imageupload'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JobCardDeletion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('jobcard_id', models.BigIntegerField()),
+                ('ticket_no', models.CharField(max_length=20)),
+                ('deleted_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['deleted_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='jobcard',
+            index=models.Index(fields=['updated_at'], name='jobcard_updated_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='jobcarddeletion',
+            index=models.Index(fields=['deleted_at'], name='jobcarddeletion_deleted_idx'),
+        ),
+    ]
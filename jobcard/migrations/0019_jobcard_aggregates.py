@@ -0,0 +1,50 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:31
+
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobcard', '0018_jobcard_change_feed'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='jobcard',
+            name='complaint_count',
+            field=models.GeneratedField(db_persist=True, expression=models.Func(models.Func(models.F('items_data'), models.Value('$[*].complaints[*]'), function='jsonb_path_query_array'), function='jsonb_array_length', output_field=models.IntegerField()), output_field=models.IntegerField()),
+        ),
+        migrations.AddField(
+            model_name='jobcard',
+            name='item_count',
+            field=models.GeneratedField(db_persist=True, expression=models.Func(models.Func(models.F('items_data'), models.Value('$[*]'), function='jsonb_path_query_array'), function='jsonb_array_length', output_field=models.IntegerField()), output_field=models.IntegerField()),
+        ),
+        migrations.AddField(
+            model_name='jobcard',
+            name='item_names',
+            field=models.GeneratedField(db_persist=True, expression=models.Func(models.F('items_data'), models.Value('$[*].item'), function='jsonb_path_query_array'), output_field=models.JSONField()),
+        ),
+        migrations.AddField(
+            model_name='jobcard',
+            name='worst_status',
+            field=models.GeneratedField(db_persist=True, expression=models.Case(models.When(models.Func(models.F('items_data'), models.Value('$[*] ? (@.status == "pending")'), function='jsonb_path_exists', output_field=models.BooleanField()), then=models.Value('pending')), models.When(models.Func(models.F('items_data'), models.Value('$[*] ? (@.status == "logged" || !exists(@.status))'), function='jsonb_path_exists', output_field=models.BooleanField()), then=models.Value('logged')), models.When(models.Func(models.F('items_data'), models.Value('$[*] ? (@.status == "sent_technician")'), function='jsonb_path_exists', output_field=models.BooleanField()), then=models.Value('sent_technician')), models.When(models.Func(models.F('items_data'), models.Value('$[*] ? (@.status == "rejected")'), function='jsonb_path_exists', output_field=models.BooleanField()), then=models.Value('rejected')), models.When(models.Func(models.F('items_data'), models.Value('$[*] ? (@.status == "returned")'), function='jsonb_path_exists', output_field=models.BooleanField()), then=models.Value('returned')), models.When(models.Func(models.F('items_data'), models.Value('$[*] ? (@.status == "completed")'), function='jsonb_path_exists', output_field=models.BooleanField()), then=models.Value('completed')), default=models.Value(''), output_field=models.CharField(max_length=20)), output_field=models.CharField(max_length=20)),
+        ),
+        migrations.AddIndex(
+            model_name='jobcard',
+            index=models.Index(fields=['item_count'], name='jobcard_item_count_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='jobcard',
+            index=models.Index(fields=['complaint_count'], name='jobcard_complaint_count_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='jobcard',
+            index=models.Index(fields=['worst_status', '-created_at'], name='jobcard_worst_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='jobcard',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['item_names'], name='jobcard_item_names_idx'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:32
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobcard', '0019_jobcard_aggregates'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ItemStatusChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveIntegerField(help_text='Index of item in items_data array')),
+                ('status', models.CharField(choices=[('logged', 'Logged'), ('sent_technician', 'Sent To Technician'), ('pending', 'Pending'), ('completed', 'Completed'), ('returned', 'Returned'), ('rejected', 'Rejected')], max_length=20)),
+                ('changed_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('jobcard', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='status_changes', to='jobcard.jobcard')),
+            ],
+            options={
+                'ordering': ['jobcard', 'position', 'changed_at'],
+                'indexes': [models.Index(fields=['jobcard', 'position', 'changed_at'], name='itemstatuschange_item_idx')],
+            },
+        ),
+        # Existing items start their current status at the job card's last update
+        migrations.RunSQL(
+            """
+            INSERT INTO jobcard_itemstatuschange (jobcard_id, position, status, changed_at)
+            SELECT item.jobcard_id, item.position, item.status, jobcard.updated_at
+            FROM jobcard_jobcarditem item
+            JOIN jobcard_jobcard jobcard ON jobcard.id = item.jobcard_id
+            """,
+            migrations.RunSQL.noop,
+        ),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:42
+
+import django.contrib.postgres.search
+from django.db import migrations, models
+
+# Partitioned by year of created_at (partitions are created on demand by
+# jobcard.archive), so the primary key has to include created_at
+CREATE_ARCHIVE_SQL = """
+CREATE TABLE jobcard_archivedjobcard (
+    id bigint NOT NULL,
+    ticket_no varchar(20) NOT NULL,
+    customer varchar(100) NOT NULL,
+    address text NOT NULL,
+    phone varchar(15) NOT NULL,
+    items_data jsonb NOT NULL,
+    item_names jsonb NOT NULL,
+    worst_status varchar(20) NOT NULL,
+    images jsonb NOT NULL DEFAULT '[]',
+    status_history jsonb NOT NULL DEFAULT '[]',
+    search_vector tsvector NOT NULL,
+    created_at timestamptz NOT NULL,
+    updated_at timestamptz NOT NULL,
+    archived_at timestamptz NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at);
+CREATE INDEX archivedjobcard_created_idx ON jobcard_archivedjobcard (created_at DESC);
+CREATE INDEX archivedjobcard_ticket_no_idx ON jobcard_archivedjobcard (ticket_no);
+CREATE INDEX archivedjobcard_search_idx ON jobcard_archivedjobcard USING gin (search_vector);
+CREATE INDEX archivedjobcard_customer_trgm_idx ON jobcard_archivedjobcard USING gin (customer gin_trgm_ops);
+CREATE INDEX archivedjobcard_phone_trgm_idx ON jobcard_archivedjobcard USING gin (phone gin_trgm_ops);
+CREATE INDEX archivedjobcard_ticket_no_trgm_idx ON jobcard_archivedjobcard USING gin (ticket_no gin_trgm_ops);
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobcard', '0022_filetombstone'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedJobCard',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('ticket_no', models.CharField(max_length=20)),
+                ('customer', models.CharField(max_length=100)),
+                ('address', models.TextField()),
+                ('phone', models.CharField(max_length=15)),
+                ('items_data', models.JSONField(default=list)),
+                ('item_names', models.JSONField(default=list)),
+                ('worst_status', models.CharField(max_length=20)),
+                ('images', models.JSONField(default=list)),
+                ('status_history', models.JSONField(default=list)),
+                ('search_vector', django.contrib.postgres.search.SearchVectorField()),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField()),
+            ],
+            options={
+                'db_table': 'jobcard_archivedjobcard',
+                'ordering': ['-created_at'],
+                'managed': False,
+            },
+        ),
+        migrations.RunSQL(CREATE_ARCHIVE_SQL, "DROP TABLE IF EXISTS jobcard_archivedjobcard CASCADE"),
+    ]
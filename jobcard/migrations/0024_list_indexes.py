@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:43
+
+import django.contrib.postgres.indexes
+import django.db.models.deletion
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Built without blocking writes to the job card and image tables
+    atomic = False
+
+    dependencies = [
+        ('jobcard', '0023_archivedjobcard'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='jobcard',
+            index=models.Index(fields=['-created_at'], name='jobcard_created_at_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='jobcard',
+            index=models.Index(fields=['phone'], name='jobcard_phone_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='jobcard',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass('items_data', name='jsonb_path_ops'), name='jobcard_items_data_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='jobcardimage',
+            index=models.Index(fields=['jobcard', 'item_index', 'complaint_index', 'uploaded_at'], name='jobcardimage_slot_idx'),
+        ),
+        # jobcardimage_slot_idx covers the lookups the plain jobcard_id index served
+        migrations.AlterField(
+            model_name='jobcardimage',
+            name='jobcard',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='images', to='jobcard.jobcard'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:52
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('jobcard', '0024_list_indexes'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='jobcarditem',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('serial'), name='gin_trgm_ops'), name='jobcarditem_serial_trgm_idx'),
+        ),
+    ]
@@ -0,0 +1,78 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:08
+
+from django.db import migrations, models
+
+# One statement-level trigger per event keeps jobcard_jobcardchange current for
+# every write path (save, update(), bulk_update, raw SQL, the delete CTE), with
+# one upsert per statement rather than per row.
+CREATE_CHANGE_LOG_SQL = """
+CREATE FUNCTION jobcard_change_log() RETURNS trigger LANGUAGE plpgsql AS $$
+DECLARE
+    writer bigint := pg_current_xact_id()::text::bigint;
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO jobcard_jobcardchange (jobcard_id, ticket_no, created_xid, change_xid, deleted, changed_at)
+        SELECT id, ticket_no, writer, writer, false, NOW() FROM new_rows
+        ON CONFLICT (jobcard_id) DO UPDATE SET
+            ticket_no = EXCLUDED.ticket_no, created_xid = EXCLUDED.created_xid,
+            change_xid = EXCLUDED.change_xid, deleted = false, changed_at = EXCLUDED.changed_at;
+    ELSIF TG_OP = 'UPDATE' THEN
+        INSERT INTO jobcard_jobcardchange (jobcard_id, ticket_no, created_xid, change_xid, deleted, changed_at)
+        SELECT id, ticket_no, 0, writer, false, NOW() FROM new_rows
+        ON CONFLICT (jobcard_id) DO UPDATE SET
+            ticket_no = EXCLUDED.ticket_no, change_xid = EXCLUDED.change_xid, changed_at = EXCLUDED.changed_at;
+    ELSE
+        INSERT INTO jobcard_jobcardchange (jobcard_id, ticket_no, created_xid, change_xid, deleted, changed_at)
+        SELECT id, ticket_no, 0, writer, true, NOW() FROM old_rows
+        ON CONFLICT (jobcard_id) DO UPDATE SET
+            change_xid = EXCLUDED.change_xid, deleted = true, changed_at = EXCLUDED.changed_at;
+    END IF;
+    RETURN NULL;
+END
+$$;
+CREATE TRIGGER jobcard_change_log_insert AFTER INSERT ON jobcard_jobcard
+    REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION jobcard_change_log();
+CREATE TRIGGER jobcard_change_log_update AFTER UPDATE ON jobcard_jobcard
+    REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION jobcard_change_log();
+CREATE TRIGGER jobcard_change_log_delete AFTER DELETE ON jobcard_jobcard
+    REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION jobcard_change_log();
+"""
+
+DROP_CHANGE_LOG_SQL = """
+DROP TRIGGER IF EXISTS jobcard_change_log_insert ON jobcard_jobcard;
+DROP TRIGGER IF EXISTS jobcard_change_log_update ON jobcard_jobcard;
+DROP TRIGGER IF EXISTS jobcard_change_log_delete ON jobcard_jobcard;
+DROP FUNCTION IF EXISTS jobcard_change_log();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobcard', '0025_jobcarditem_serial_trgm'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JobCardChange',
+            fields=[
+                ('jobcard_id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('ticket_no', models.CharField(max_length=20)),
+                ('created_xid', models.BigIntegerField()),
+                ('change_xid', models.BigIntegerField()),
+                ('deleted', models.BooleanField(default=False)),
+                ('changed_at', models.DateTimeField()),
+            ],
+            options={
+                'ordering': ['change_xid', 'jobcard_id'],
+            },
+        ),
+        migrations.DeleteModel(
+            name='JobCardDeletion',
+        ),
+        migrations.AddIndex(
+            model_name='jobcardchange',
+            index=models.Index(fields=['change_xid', 'jobcard_id'], name='jobcardchange_xid_idx'),
+        ),
+        migrations.RunSQL(CREATE_CHANGE_LOG_SQL, DROP_CHANGE_LOG_SQL),
+    ]
@@ -1,9 +1,283 @@
 import os
-import uuid
+import re
 import json
-from django.db import models
+import uuid
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import (
+    SearchQuery, SearchRank, SearchVector, SearchVectorField, TrigramWordSimilarity,
+)
+from django.core.files import File
+from django.db import DEFAULT_DB_ALIAS, connection, connections, models, transaction
+from django.db.models.expressions import CombinedExpression, RawSQL
+from django.db.models.functions import Upper
+from django.utils import timezone
+
+from .cache import forget_jobcard_details
+from .storage import blob_storage
+from .images import MEDIUM_SIZE, THUMBNAIL_SIZE, is_valid_image, render_variant, variant_name
+from .tickets import reserve_ticket_numbers
+
+SEARCH_CONFIG = 'simple'
+
+
+def items_data_search_vector(path, weight):
+    """tsvector of the string values that a jsonpath selects from items_data"""
+    strings = models.Func(models.F('items_data'), models.Value(path), function='jsonb_path_query_array')
+    vector = models.Func(
+        models.Value(SEARCH_CONFIG), strings, models.Value('["string"]'),
+        function='jsonb_to_tsvector',
+    )
+    return models.Func(vector, models.Value(weight), function='setweight', output_field=SearchVectorField())
+
+
+def jobcard_search_vector():
+    """Weighted document for full-text search: ticket/customer/phone, items and serials, complaints, address"""
+    parts = [
+        SearchVector('ticket_no', 'customer', 'phone', config=SEARCH_CONFIG, weight='A'),
+        items_data_search_vector('$[*].item', 'B'),
+        items_data_search_vector('$[*].serial', 'B'),
+        items_data_search_vector('$[*].complaints[*].description', 'C'),
+        SearchVector('address', config=SEARCH_CONFIG, weight='D'),
+    ]
+    vector = parts[0]
+    for part in parts[1:]:
+        vector = CombinedExpression(vector, '||', part, output_field=SearchVectorField())
+    return vector
+
+
+class PrefixSearchQuery(SearchQuery):
+    """tsquery matching every word of text as a prefix.
+
+    The words come from to_tsvector() with the same config as search_vector,
+    so they are split the way the index was (ABC-123 becomes abc and -123).
+    """
+
+    def __init__(self, text):
+        super().__init__(text, config=SEARCH_CONFIG)
+        self.text = text
+
+    def as_sql(self, compiler, connection, **extra_context):
+        return (
+            "(SELECT to_tsquery(%s::regconfig, COALESCE(string_agg(quote_literal(lexeme) || ':*', ' & '), '')) "
+            "FROM unnest(tsvector_to_array(to_tsvector(%s::regconfig, %s))) AS lexeme)",
+            [SEARCH_CONFIG, SEARCH_CONFIG, self.text],
+        )
+
+
+# Item statuses from most to least in need of attention; the first one any
+# item has becomes the job card's worst_status
+WORST_STATUS_ORDER = ('pending', 'logged', 'sent_technician', 'rejected', 'returned', 'completed')
+
+
+def items_data_count(path):
+    """Number of values a jsonpath selects from items_data"""
+    return models.Func(
+        models.Func(models.F('items_data'), models.Value(path), function='jsonb_path_query_array'),
+        function='jsonb_array_length', output_field=models.IntegerField(),
+    )
+
+
+def worst_item_status():
+    """The first status of WORST_STATUS_ORDER held by any item ('' without items); items lacking one count as logged"""
+    whens = []
+    for status in WORST_STATUS_ORDER:
+        path = f'$[*] ? (@.status == "{status}")'
+        if status == 'logged':
+            path = '$[*] ? (@.status == "logged" || !exists(@.status))'
+        has_status = models.Func(
+            models.F('items_data'), models.Value(path),
+            function='jsonb_path_exists', output_field=models.BooleanField(),
+        )
+        whens.append(models.When(has_status, then=models.Value(status)))
+    return models.Case(*whens, default=models.Value(''), output_field=models.CharField(max_length=20))
+
+
+class JobCardQuerySet(models.QuerySet):
+    def with_images(self):
+        """Load the images of every selected job card in one extra query"""
+        return self.prefetch_related('images')
+
+    def text_search(self, text, *extra_matches):
+        """Ranked full-text search with prefix matching, plus fuzzy customer and partial phone/ticket matches"""
+        text = text.strip()
+        if not re.search(r'\w', text):
+            return self.annotate(rank=models.Value(0.0, output_field=models.FloatField())).none()
+        query = PrefixSearchQuery(text)
+        matches = (
+            models.Q(search_vector=query) |
+            models.Q(customer__trigram_word_similar=text) |
+            models.Q(phone__contains=text) |
+            models.Q(ticket_no__contains=text.upper())
+        )
+        for extra in extra_matches:
+            matches |= extra
+        return self.annotate(
+            rank=SearchRank(models.F('search_vector'), query) + TrigramWordSimilarity(text, 'customer'),
+        ).filter(matches)
+
+    def search(self, text):
+        """text_search() that also finds any part of a serial (e.g. 123 in ABC-123), which word prefixes miss"""
+        serials = JobCardItem.objects.filter(jobcard=models.OuterRef('pk'), serial__icontains=text.strip())
+        return self.text_search(text, models.Q(models.Exists(serials)))
+
+    def set_item_status(self, pk, item_index, status):
+        """Rewrite only items_data[item_index].status in place; False if the job card or item is missing.
+
+        jsonb_set runs inside the UPDATE against the latest row version, so
+        concurrent updates to sibling items of one ticket cannot overwrite each other.
+        """
+        with transaction.atomic(using=self.db):
+            updated = self.filter(
+                pk=pk, item_count__gt=item_index,
+            ).update(
+                items_data=RawSQL(
+                    "jsonb_set(items_data, %s::text[], to_jsonb(%s::text))",
+                    [[str(item_index), 'status'], status],
+                ),
+                updated_at=timezone.now(),
+            )
+            if updated:
+                changed = JobCardItem.objects.using(self.db).filter(
+                    jobcard_id=pk, position=item_index,
+                ).exclude(status=status).update(status=status)
+                if changed:
+                    ItemStatusChange.objects.using(self.db).create(
+                        jobcard_id=pk, position=item_index, status=status,
+                    )
+                forget_jobcard_details([pk], using=self.db)
+        return bool(updated)
+
+    async def aset_item_status(self, pk, item_index, status):
+        return await sync_to_async(self.set_item_status)(pk, item_index, status)
+
+    def bulk_set_item_status(self, updates):
+        """Apply (jobcard_id, item_index, status) triples in one transaction.
+
+        Returns one error message per entry, None where the update was applied.
+        The job cards are locked and loaded in one query and written back with
+        bulk_update, so the cost does not grow with one round-trip per entry.
+        """
+        valid_statuses = dict(JobCard.STATUS_CHOICES)
+        errors = [None] * len(updates)
+        with transaction.atomic(using=self.db):
+            jobcard_ids = {jobcard_id for jobcard_id, _, _ in updates}
+            jobcards = self.select_for_update().only('id', 'items_data', 'updated_at').in_bulk(jobcard_ids)
+            items = {
+                (item.jobcard_id, item.position): item
+                for item in JobCardItem.objects.using(self.db).filter(jobcard_id__in=jobcard_ids)
+            }
+            now = timezone.now()
+            changed_jobcards = {}
+            changed_items = {}
+            status_changes = []
+            for entry, (jobcard_id, item_index, status) in enumerate(updates):
+                jobcard = jobcards.get(jobcard_id)
+                if status not in valid_statuses:
+                    errors[entry] = f"Invalid status: {status}"
+                elif jobcard is None:
+                    errors[entry] = "Job card not found"
+                elif not 0 <= item_index < len(jobcard.items_data or []):
+                    errors[entry] = "Item not found"
+                else:
+                    jobcard.items_data[item_index]['status'] = status
+                    jobcard.updated_at = now
+                    changed_jobcards[jobcard_id] = jobcard
+                    item = items.get((jobcard_id, item_index))
+                    if item is not None and item.status != status:
+                        item.status = status
+                        changed_items[item.pk] = item
+                        status_changes.append(ItemStatusChange(
+                            jobcard_id=jobcard_id, position=item_index, status=status, changed_at=now,
+                        ))
+            self.model.objects.using(self.db).bulk_update(changed_jobcards.values(), ['items_data', 'updated_at'])
+            JobCardItem.objects.using(self.db).bulk_update(changed_items.values(), ['status'])
+            ItemStatusChange.objects.using(self.db).bulk_create(status_changes)
+            forget_jobcard_details(changed_jobcards, using=self.db)
+        return errors
+
+    def bulk_create_with_items(self, jobcards, batch_size=None):
+        """bulk_create job cards along with their JobCardItem/Complaint rows and first status entries.
+
+        Job cards without a ticket_no get numbers reserved in one round-trip.
+        created_at values already set on the instances are kept, which
+        auto_now_add would otherwise overwrite.
+        """
+        missing = [jobcard for jobcard in jobcards if not jobcard.ticket_no]
+        for jobcard, ticket_no in zip(missing, reserve_ticket_numbers(len(missing), using=self.db)):
+            jobcard.ticket_no = ticket_no
+        created_at = {id(jobcard): jobcard.created_at for jobcard in jobcards if jobcard.created_at}
+
+        with transaction.atomic(using=self.db):
+            created = self.bulk_create(jobcards, batch_size=batch_size)
+            backdated = []
+            for jobcard in created:
+                if id(jobcard) in created_at:
+                    jobcard.created_at = created_at[id(jobcard)]
+                    backdated.append(jobcard)
+            self.model.objects.using(self.db).bulk_update(backdated, ['created_at'], batch_size=batch_size)
+
+            items, complaints, status_changes = [], [], []
+            for jobcard in created:
+                jobcard_items, jobcard_complaints = jobcard.build_item_rows()
+                items.extend(jobcard_items)
+                complaints.extend(jobcard_complaints)
+                status_changes.extend(
+                    ItemStatusChange(jobcard=jobcard, position=item.position, status=item.status,
+                                     changed_at=jobcard.created_at)
+                    for item in jobcard_items
+                )
+            JobCardItem.objects.using(self.db).bulk_create(items, batch_size=batch_size)
+            Complaint.objects.using(self.db).bulk_create(complaints, batch_size=batch_size)
+            ItemStatusChange.objects.using(self.db).bulk_create(status_changes, batch_size=batch_size)
+        return created
+
+    def delete_with_files(self):
+        """Delete the selected job cards and everything hanging off them in a single statement.
+
+        Image file names go to FileTombstone for the sweeper task (the change
+        feed learns of the deletes from the change log triggers). Returns
+        {pk: ticket_no} of the deleted job cards.
+        """
+        from .tasks import enqueue
+
+        targets, params = pk_subquery(self)
+        with transaction.atomic(using=self.db):
+            with connections[self.db].cursor() as cursor:
+                cursor.execute(DELETE_JOBCARDS_SQL.format(targets=targets), params)
+                deleted = dict(cursor.fetchall())
+            if deleted:
+                forget_jobcard_details(deleted, using=self.db)
+                enqueue('sweep_file_tombstones')
+        return deleted
+
+    def delete(self):
+        """Route plain delete() (admin, shell, tests) through delete_with_files(), so no files are orphaned"""
+        if self.query.is_sliced:
+            raise TypeError("Cannot use 'limit' or 'offset' with delete().")
+        deleted = self.delete_with_files()
+        return len(deleted), {self.model._meta.label: len(deleted)}
+
+    delete.alters_data = True
+    delete.queryset_only = True
+
+    def touch(self, pks):
+        """Bump updated_at of job cards whose images changed, so cached detail payloads go stale"""
+        pks = {pk for pk in pks if pk is not None}
+        if pks:
+            self.filter(pk__in=pks).update(updated_at=timezone.now())
+            forget_jobcard_details(pks, using=self.db)
+
+    def having_items(self, **filters):
+        """Job cards with at least one JobCardItem matching filters, e.g. status='pending', item='Laptop'"""
+        items = JobCardItem.objects.filter(jobcard=models.OuterRef('pk'), **filters)
+        return self.filter(models.Exists(items))
+
 
 class JobCard(models.Model):
+    ITEM_TYPES = ["Mouse", "Keyboard", "CPU", "Laptop", "Desktop", "Printer", "Monitor", "Other"]
+
     STATUS_CHOICES = [
         ('logged', 'Logged'),
         ('sent_technician', 'Sent To Technician'),
@@ -42,35 +316,146 @@ class JobCard(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Maintained by PostgreSQL from the columns above and items_data
+    search_vector = models.GeneratedField(
+        expression=jobcard_search_vector(),
+        output_field=SearchVectorField(),
+        db_persist=True,
+    )
+    # Aggregates of items_data, also maintained by PostgreSQL (including jsonb_set status updates)
+    item_count = models.GeneratedField(
+        expression=items_data_count('$[*]'),
+        output_field=models.IntegerField(),
+        db_persist=True,
+    )
+    complaint_count = models.GeneratedField(
+        expression=items_data_count('$[*].complaints[*]'),
+        output_field=models.IntegerField(),
+        db_persist=True,
+    )
+    worst_status = models.GeneratedField(
+        expression=worst_item_status(),
+        output_field=models.CharField(max_length=20),
+        db_persist=True,
+    )
+    item_names = models.GeneratedField(
+        expression=models.Func(models.F('items_data'), models.Value('$[*].item'), function='jsonb_path_query_array'),
+        output_field=models.JSONField(),
+        db_persist=True,
+    )
+
+    objects = JobCardQuerySet.as_manager()
+
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            GinIndex(fields=['search_vector'], name='jobcard_search_vector_idx'),
+            GinIndex(OpClass('customer', name='gin_trgm_ops'), name='jobcard_customer_trgm_idx'),
+            GinIndex(OpClass('phone', name='gin_trgm_ops'), name='jobcard_phone_trgm_idx'),
+            GinIndex(OpClass('ticket_no', name='gin_trgm_ops'), name='jobcard_ticket_no_trgm_idx'),
+            models.Index(fields=['updated_at'], name='jobcard_updated_at_idx'),
+            models.Index(fields=['item_count'], name='jobcard_item_count_idx'),
+            models.Index(fields=['complaint_count'], name='jobcard_complaint_count_idx'),
+            models.Index(fields=['worst_status', '-created_at'], name='jobcard_worst_status_idx'),
+            GinIndex(fields=['item_names'], name='jobcard_item_names_idx'),
+            # The list page's default order and date range filter, exact phone lookups
+            # and items_data containment (@>) filters
+            models.Index(fields=['-created_at'], name='jobcard_created_at_idx'),
+            models.Index(fields=['phone'], name='jobcard_phone_idx'),
+            GinIndex(OpClass('items_data', name='jsonb_path_ops'), name='jobcard_items_data_idx'),
+        ]
 
     def __str__(self):
         return f"{self.customer} - {self.ticket_no}"
     
     def save(self, *args, **kwargs):
         if not self.ticket_no:
-            self.ticket_no = self.generate_ticket_number()
-        super().save(*args, **kwargs)
+            self.ticket_no = self.generate_ticket_number(using=kwargs.get('using'))
+        update_fields = kwargs.get('update_fields')
+        adding = self._state.adding
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if update_fields is None or 'items_data' in update_fields:
+                self.sync_items(replace=not adding)
+            if not adding:
+                forget_jobcard_details([self.pk], using=self._state.db)
 
-    def generate_ticket_number(self):
-        while True:
-            ticket_no = f"TK-{uuid.uuid4().hex[:8].upper()}"
-            if not JobCard.objects.filter(ticket_no=ticket_no).exists():
-                return ticket_no
+    def sync_items(self, replace=True):
+        """Rebuild the JobCardItem/Complaint rows from items_data, logging item status changes"""
+        previous_statuses = {}
+        if replace:
+            previous_statuses = dict(self.items.values_list('position', 'status'))
+            self.items.all().delete()
+        items, complaints = self.build_item_rows()
+        JobCardItem.objects.bulk_create(items)
+        Complaint.objects.bulk_create(complaints)
+        ItemStatusChange.objects.bulk_create(
+            ItemStatusChange(jobcard=self, position=item.position, status=item.status)
+            for item in items if previous_statuses.get(item.position) != item.status
+        )
+
+    def build_item_rows(self):
+        """Unsaved JobCardItem and Complaint rows mirroring items_data"""
+        items = []
+        complaints = []
+        for position, item_data in enumerate(self.items_data or []):
+            item = JobCardItem(
+                jobcard=self,
+                position=position,
+                item=(item_data.get('item') or '')[:100],
+                serial=(item_data.get('serial') or '')[:100],
+                config=item_data.get('config') or '',
+                status=item_data.get('status') or 'logged',
+            )
+            items.append(item)
+            for complaint_position, complaint in enumerate(item_data.get('complaints', [])):
+                complaints.append(Complaint(
+                    item=item,
+                    position=complaint_position,
+                    description=complaint.get('description') or '',
+                    notes=complaint.get('notes') or '',
+                ))
+        return items, complaints
+
+    def generate_ticket_number(self, using=None):
+        """Take the next number from the ticket sequence (no uniqueness lookup needed)"""
+        return reserve_ticket_numbers(1, using=using or self._state.db or DEFAULT_DB_ALIAS)[0]
+
+    def delete(self, using=None, keep_parents=False):
+        # One statement for the job card and its rows; image files are swept after commit
+        deleted = JobCard.objects.using(using or self._state.db).filter(pk=self.pk).delete_with_files()
+        self.pk = None
+        return len(deleted), {self._meta.label: len(deleted)}
 
-    def delete(self, *args, **kwargs):
-        # Delete all associated images
+    def get_images_by_item(self):
+        """Return images grouped by item_index (uses prefetched images when available)"""
+        images_by_item = {}
         for image in self.images.all():
-            image.delete()
-        super().delete(*args, **kwargs)
+            images_by_item.setdefault(image.item_index, []).append(image)
+        return images_by_item
+
+    def get_images_by_complaint(self):
+        """Return images grouped by (item_index, complaint_index)"""
+        images_by_complaint = {}
+        for image in self.images.all():
+            key = (image.item_index, image.complaint_index)
+            images_by_complaint.setdefault(key, []).append(image)
+        return images_by_complaint
+
+    def has_loaded(self, field_name):
+        """True if field_name holds a value from the database (generated fields are reloaded lazily after save)"""
+        return field_name not in self.get_deferred_fields()
 
     def get_total_items(self):
         """Return total number of items in this job card"""
+        if self.has_loaded('item_count'):
+            return self.item_count
         return len(self.items_data) if self.items_data else 0
 
     def get_total_complaints(self):
         """Return total number of complaints across all items"""
+        if self.has_loaded('complaint_count'):
+            return self.complaint_count
         total = 0
         if self.items_data:
             for item in self.items_data:
@@ -79,10 +464,19 @@ class JobCard(models.Model):
 
     def get_items_list(self):
         """Return list of item names"""
+        if self.has_loaded('item_names'):
+            return self.item_names
         if self.items_data:
             return [item.get('item', '') for item in self.items_data]
         return []
 
+    def iter_item_complaints(self):
+        """Yield (item, complaint) pairs, one per complaint; complaint is None for items without any"""
+        for item in self.items_data or []:
+            complaints = item.get('complaints') or [None]
+            for complaint in complaints:
+                yield item, complaint
+
     def get_all_complaints_text(self):
         """Return formatted string of all complaints"""
         complaints = []
@@ -96,22 +490,579 @@ class JobCard(models.Model):
         return '; '.join(complaints) if complaints else 'No complaints'
 
 
+IMAGE_FILE_FIELDS = ('image', 'thumbnail', 'medium')
+
+
+def unsaved_files(images, field_names=IMAGE_FILE_FIELDS):
+    """(image, field_name, content) for file fields whose content has not been stored yet"""
+    unsaved = []
+    for image in images:
+        for field_name in field_names:
+            field = getattr(image, field_name)
+            if field and not field._committed:
+                unsaved.append((image, field_name, field.file))
+    return unsaved
+
+
+class JobCardImageQuerySet(models.QuerySet):
+    def bulk_create_with_variants(self, images, batch_size=None, touch=True):
+        """bulk_create images (files are written by the ImageField) and queue one variants task for all of them.
+
+        Pass touch=False when the job cards were saved in the same transaction anyway.
+        """
+        from .tasks import enqueue
+
+        written = unsaved_files(images)
+        with transaction.atomic(using=self.db):
+            created = self.bulk_create(images, batch_size=batch_size)
+            if created:
+                self.pin_files(written)
+                if touch:
+                    JobCard.objects.using(self.db).touch(image.jobcard_id for image in created)
+                enqueue('generate_image_variants', image_ids=[image.pk for image in created])
+        return created
+
+    def attach(self, jobcard, attachments):
+        """Attach unattached images: attachments is (item_index, complaint_index, image_id) triples.
+
+        Runs one UPDATE per (item, complaint) slot; ids that do not belong to an
+        unattached image are ignored. Returns the number of images attached.
+        """
+        slots = {}
+        for item_index, complaint_index, image_id in attachments:
+            slots.setdefault((item_index, complaint_index), set()).add(image_id)
+        if not slots:
+            return 0
+        attached = 0
+        with transaction.atomic(using=self.db):
+            for (item_index, complaint_index), image_ids in slots.items():
+                attached += self.filter(pk__in=image_ids, jobcard__isnull=True).update(
+                    jobcard=jobcard, item_index=item_index, complaint_index=complaint_index,
+                )
+            if attached:
+                JobCard.objects.using(self.db).touch([jobcard.pk])
+        return attached
+
+    def delete_with_files(self, touch=True):
+        """Delete the selected images in one statement; their files are swept after commit"""
+        from .tasks import enqueue
+
+        targets, params = pk_subquery(self)
+        with transaction.atomic(using=self.db):
+            with connections[self.db].cursor() as cursor:
+                cursor.execute(DELETE_IMAGES_SQL.format(targets=targets), params)
+                jobcard_ids = [row[0] for row in cursor.fetchall()]
+            if jobcard_ids:
+                enqueue('sweep_file_tombstones')
+                if touch:
+                    JobCard.objects.using(self.db).touch(jobcard_ids)
+        return len(jobcard_ids)
+
+    def lock_files(self, names):
+        """Serialize pin_files() and release_files() on the same blobs until the transaction ends"""
+        with connections[self.db].cursor() as cursor:
+            cursor.execute(
+                "SELECT pg_advisory_xact_lock(hashtextextended(name, 0)) "
+                "FROM (SELECT DISTINCT name FROM unnest(%s::text[]) AS name ORDER BY name) AS names",
+                [sorted(names)],
+            )
+
+    def referenced_files(self, names):
+        """The subset of names that some image row still points at"""
+        names = list(names)
+        referenced = set()
+        for field_name in IMAGE_FILE_FIELDS:
+            referenced.update(
+                self.filter(**{f'{field_name}__in': names}).values_list(field_name, flat=True)
+            )
+        return referenced
+
+    def pin_files(self, written):
+        """Make sure the blobs of freshly written rows exist.
+
+        written holds (image, field_name, content) for files saved in this
+        transaction. Blobs are shared, so one this upload deduplicated against
+        may have been released in the meantime; holding the blob locks,
+        rewrite any that went missing.
+        """
+        if not written:
+            return
+        files = [(getattr(image, field_name), content) for image, field_name, content in written]
+        self.lock_files({field.name for field, _ in files})
+        for field, content in files:
+            if not field.storage.exists(field.name):
+                field.storage.restore(field.name, content)
+
+    def release_files(self, names):
+        """Unlink the blobs in names that no image row references any more"""
+        with transaction.atomic(using=self.db):
+            self.lock_files(names)
+            unreferenced = set(names) - self.referenced_files(names)
+            for name in unreferenced:
+                blob_storage.delete(name)
+        return unreferenced
+
+
 class JobCardImage(models.Model):
-    jobcard = models.ForeignKey(JobCard, related_name='images', on_delete=models.CASCADE)
-    image = models.ImageField(upload_to='jobcard_images/')
+    # Empty while a chunked upload waits to be attached by the create/edit form
+    # Indexed by jobcardimage_slot_idx, which leads with jobcard_id
+    jobcard = models.ForeignKey(JobCard, related_name='images', on_delete=models.CASCADE, null=True, blank=True,
+                                db_index=False)
+    # Files are stored once per distinct content and shared between rows
+    image = models.ImageField(upload_to='jobcard_images/', storage=blob_storage, db_index=True)
+    # Downscaled JPEG copies generated from image on save
+    thumbnail = models.ImageField(upload_to='jobcard_images/thumbnails/', storage=blob_storage,
+                                  blank=True, db_index=True)
+    medium = models.ImageField(upload_to='jobcard_images/medium/', storage=blob_storage,
+                               blank=True, db_index=True)
     uploaded_at = models.DateTimeField(auto_now_add=True)
     
     # Additional fields to identify which item and complaint this image belongs to
     item_index = models.IntegerField(default=0, help_text="Index of item in items_data array")
     complaint_index = models.IntegerField(default=0, help_text="Index of complaint within item")
 
+    objects = JobCardImageQuerySet.as_manager()
+
     def __str__(self):
+        if self.jobcard is None:
+            return f"Unattached image {self.image.name}"
         return f"Image for {self.jobcard.customer} - {self.jobcard.ticket_no}"
 
-    def delete(self, *args, **kwargs):
-        if self.image and os.path.isfile(self.image.path):
-            os.remove(self.image.path)
-        super().delete(*args, **kwargs)
+    def save(self, *args, **kwargs):
+        from .tasks import enqueue
+
+        written = unsaved_files([self])
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            JobCardImage.objects.pin_files(written)
+            JobCard.objects.touch([self.jobcard_id])
+            if self.image and not (self.thumbnail and self.medium):
+                enqueue('generate_image_variants', image_ids=[self.pk])
+
+    def generate_variants(self):
+        """Create the thumbnail and medium variants that are missing"""
+        written = []
+        for field_name, size in (('thumbnail', THUMBNAIL_SIZE), ('medium', MEDIUM_SIZE)):
+            if getattr(self, field_name):
+                continue
+            content = render_variant(self.image, size)
+            if content is not None:
+                getattr(self, field_name).save(variant_name(self.image.name), content, save=False)
+                written.append((self, field_name, content))
+        changed = [field_name for _, field_name, _ in written]
+        if changed:
+            with transaction.atomic():
+                super().save(update_fields=changed)
+                JobCardImage.objects.pin_files(written)
+                JobCard.objects.touch([self.jobcard_id])
+        return changed
+
+    @property
+    def thumbnail_url(self):
+        return self.thumbnail.url if self.thumbnail else self.image.url
+
+    @property
+    def medium_url(self):
+        return self.medium.url if self.medium else self.image.url
+
+    def get_file_names(self):
+        return [field.name for field in (self.image, self.thumbnail, self.medium) if field]
+
+    def delete(self, using=None, keep_parents=False):
+        # Shared blobs are released by the sweeper once the row deletion commits
+        deleted = JobCardImage.objects.using(using or self._state.db).filter(pk=self.pk).delete_with_files()
+        self.pk = None
+        return deleted, {self._meta.label: deleted}
+
+    class Meta:
+        ordering = ['item_index', 'complaint_index', 'uploaded_at']
+        indexes = [
+            # Images are always fetched per job card in this order (with_images() prefetch, detail API)
+            models.Index(fields=['jobcard', 'item_index', 'complaint_index', 'uploaded_at'],
+                         name='jobcardimage_slot_idx'),
+        ]
+
+
+class JobCardItem(models.Model):
+    """Relational copy of one entry of JobCard.items_data, kept in sync on save"""
+    jobcard = models.ForeignKey(JobCard, related_name='items', on_delete=models.CASCADE)
+    position = models.PositiveIntegerField(help_text="Index of item in items_data array")
+    item = models.CharField(max_length=100)
+    serial = models.CharField(max_length=100, blank=True)
+    config = models.TextField(blank=True)
+    status = models.CharField(max_length=20, choices=JobCard.STATUS_CHOICES, default='logged')
+
+    def __str__(self):
+        return f"{self.item} ({self.serial}) - {self.jobcard.ticket_no}"
+
+    class Meta:
+        ordering = ['jobcard', 'position']
+        constraints = [
+            models.UniqueConstraint(fields=['jobcard', 'position'], name='jobcarditem_unique_position'),
+        ]
+        indexes = [
+            models.Index(fields=['status'], name='jobcarditem_status_idx'),
+            models.Index(fields=['serial'], name='jobcarditem_serial_idx'),
+            models.Index(fields=['item', 'status'], name='jobcarditem_item_status_idx'),
+            # serial__icontains in JobCard search (UPPER(serial) LIKE UPPER('%...%'))
+            GinIndex(OpClass(Upper('serial'), name='gin_trgm_ops'), name='jobcarditem_serial_trgm_idx'),
+        ]
+
+
+class Complaint(models.Model):
+    """Relational copy of one complaint of a JobCardItem"""
+    item = models.ForeignKey(JobCardItem, related_name='complaints', on_delete=models.CASCADE)
+    position = models.PositiveIntegerField(help_text="Index of complaint within item")
+    description = models.TextField()
+    notes = models.TextField(blank=True)
+
+    def __str__(self):
+        return f"{self.item.item}: {self.description}"
+
+    class Meta:
+        ordering = ['item', 'position']
+        constraints = [
+            models.UniqueConstraint(fields=['item', 'position'], name='complaint_unique_position'),
+        ]
+
+
+class ItemStatusChange(models.Model):
+    """An item (by position in items_data) entering a status; the next change for the same item ends the period"""
+    jobcard = models.ForeignKey(JobCard, related_name='status_changes', on_delete=models.CASCADE)
+    position = models.PositiveIntegerField(help_text="Index of item in items_data array")
+    status = models.CharField(max_length=20, choices=JobCard.STATUS_CHOICES)
+    changed_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.jobcard_id}/{self.position} -> {self.status} at {self.changed_at:%Y-%m-%d %H:%M}"
+
+    class Meta:
+        ordering = ['jobcard', 'position', 'changed_at']
+        indexes = [
+            models.Index(fields=['jobcard', 'position', 'changed_at'], name='itemstatuschange_item_idx'),
+        ]
+
+
+class JobCardChangeQuerySet(models.QuerySet):
+    def horizon(self):
+        """Oldest transaction id still running: every change stamped below it is committed (or rolled back).
+
+        Transaction ids are handed out when a transaction first writes, not
+        when it commits, so a feed cursor taken from the clock or from the
+        highest id seen could step past a slow transaction that commits later.
+        """
+        with connections[self.db].cursor() as cursor:
+            cursor.execute("SELECT pg_snapshot_xmin(pg_current_snapshot())::text::bigint")
+            return cursor.fetchone()[0]
+
+
+class JobCardChange(models.Model):
+    """Latest change to each job card, read by the change feed.
+
+    Kept by the jobcard_change_log triggers (migration 0026) for every
+    insert, update and delete, whatever code path runs it. change_xid is the
+    writing transaction's id (pg_current_xact_id()); created_xid is 0 for job
+    cards created before the log existed.
+    """
+    jobcard_id = models.BigIntegerField(primary_key=True)
+    ticket_no = models.CharField(max_length=20)
+    created_xid = models.BigIntegerField()
+    change_xid = models.BigIntegerField()
+    deleted = models.BooleanField(default=False)
+    changed_at = models.DateTimeField()
+
+    objects = JobCardChangeQuerySet.as_manager()
+
+    def __str__(self):
+        return f"{self.ticket_no} {'deleted' if self.deleted else 'changed'} in transaction {self.change_xid}"
+
+    class Meta:
+        ordering = ['change_xid', 'jobcard_id']
+        indexes = [
+            models.Index(fields=['change_xid', 'jobcard_id'], name='jobcardchange_xid_idx'),
+        ]
+
+
+class ArchivedJobCardQuerySet(models.QuerySet):
+    # Same columns as JobCard's search, copied over when a ticket is archived
+    search = JobCardQuerySet.text_search
+
+
+class ArchivedJobCard(models.Model):
+    """Closed job card moved out of the hot table by `manage.py archive_jobcards`.
+
+    The table is created by migration 0023 and partitioned by year of
+    created_at (see jobcard.archive); its primary key is (id, created_at).
+    images and status_history snapshot the rows that were deleted with the
+    job card, with image names pointing into cold_storage.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    ticket_no = models.CharField(max_length=20)
+    customer = models.CharField(max_length=100)
+    address = models.TextField()
+    phone = models.CharField(max_length=15)
+    items_data = models.JSONField(default=list)
+    item_names = models.JSONField(default=list)
+    worst_status = models.CharField(max_length=20)
+    # [{"item_index", "complaint_index", "image", "thumbnail", "medium"}]
+    images = models.JSONField(default=list)
+    # [{"position", "status", "changed_at"}]
+    status_history = models.JSONField(default=list)
+    search_vector = SearchVectorField()
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField()
+
+    objects = ArchivedJobCardQuerySet.as_manager()
+
+    class Meta:
+        managed = False
+        db_table = 'jobcard_archivedjobcard'
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.customer} - {self.ticket_no} (archived)"
+
+    def get_items_list(self):
+        return self.item_names
+
+    def get_images_by_complaint(self):
+        """Image snapshots grouped by (item_index, complaint_index)"""
+        images_by_complaint = {}
+        for image in self.images:
+            key = (image['item_index'], image['complaint_index'])
+            images_by_complaint.setdefault(key, []).append(image)
+        return images_by_complaint
+
+
+class ImportCheckpoint(models.Model):
+    """Progress of `manage.py import_jobcards` for one source, committed with each batch"""
+    source = models.CharField(max_length=255, unique=True)
+    position = models.PositiveBigIntegerField(default=0, help_text="Input records consumed so far")
+    imported = models.PositiveIntegerField(default=0)
+    failed = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.source} at record {self.position}"
+
+
+class BackgroundTask(models.Model):
+    """Queued unit of work run after commit by jobcard.tasks, in-process or by `manage.py run_tasks`"""
+    PENDING = 'pending'
+    RUNNING = 'running'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (FAILED, 'Failed'),
+    ]
+
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    run_after = models.DateTimeField(default=timezone.now)
+    started_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.status})"
 
     class Meta:
-        ordering = ['item_index', 'complaint_index', 'uploaded_at']
\ No newline at end of file
+        ordering = ['run_after', 'id']
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='backgroundtask_queue_idx'),
+        ]
+
+
+class ImageUpload(models.Model):
+    """Resumable chunked upload; chunks go to a partial file and become an unattached JobCardImage on completion"""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    filename = models.CharField(max_length=255)
+    size = models.BigIntegerField(help_text="Total size in bytes announced by the client")
+    offset = models.BigIntegerField(default=0, help_text="Bytes received so far")
+    image = models.OneToOneField(JobCardImage, null=True, blank=True, on_delete=models.SET_NULL,
+                                 related_name='upload')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.filename} ({self.offset}/{self.size})"
+
+    @property
+    def is_complete(self):
+        return self.offset >= self.size
+
+    @property
+    def partial_path(self):
+        return os.path.join(get_upload_dir(), f"{self.pk}.part")
+
+    def write_chunk(self, stream, length, block_size=64 * 1024):
+        """Append length bytes read from stream at the current offset, straight to the partial file"""
+        os.makedirs(get_upload_dir(), exist_ok=True)
+        mode = 'r+b' if os.path.exists(self.partial_path) else 'wb'
+        written = 0
+        with open(self.partial_path, mode) as partial:
+            # Drop anything past the acknowledged offset left by an interrupted chunk
+            partial.seek(self.offset)
+            partial.truncate()
+            while written < length:
+                block = stream.read(min(block_size, length - written))
+                if not block:
+                    break
+                partial.write(block)
+                written += len(block)
+        self.offset += written
+        self.save(update_fields=['offset', 'updated_at'])
+        return written
+
+    def assemble(self):
+        """Turn the finished partial file into an unattached JobCardImage; ValueError if it is not an image"""
+        if not is_valid_image(self.partial_path):
+            raise ValueError(f"{self.filename} is not a valid image")
+        with open(self.partial_path, 'rb') as partial:
+            image = JobCardImage(image=File(partial, name=self.filename))
+            image.save()
+        os.remove(self.partial_path)
+        self.image = image
+        self.save(update_fields=['image', 'updated_at'])
+        return image
+
+    def discard(self):
+        if os.path.exists(self.partial_path):
+            os.remove(self.partial_path)
+        self.delete()
+
+    class Meta:
+        ordering = ['-created_at']
+
+
+def get_upload_dir():
+    """Directory that holds partial chunked uploads"""
+    return getattr(settings, 'JOBCARD_UPLOAD_DIR', None) or os.path.join(settings.MEDIA_ROOT, 'partial_uploads')
+
+
+class FileTombstoneQuerySet(models.QuerySet):
+    def sweep(self, batch_size=500):
+        """Release the files of committed deletions batch_size at a time; returns the number of files unlinked.
+
+        Concurrent sweepers skip each other's rows. A file is only unlinked
+        once no image row references its (shared) blob any more.
+        """
+        released = 0
+        while True:
+            with transaction.atomic(using=self.db):
+                rows = list(
+                    self.select_for_update(skip_locked=True).order_by('pk').values_list('pk', 'name')[:batch_size]
+                )
+                if not rows:
+                    return released
+                released += len(JobCardImage.objects.using(self.db).release_files({name for _, name in rows}))
+                self.filter(pk__in=[pk for pk, _ in rows]).delete()
+
+
+class FileTombstone(models.Model):
+    """A stored file whose image row was deleted; removed by the sweeper task after commit"""
+    name = models.CharField(max_length=255)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    objects = FileTombstoneQuerySet.as_manager()
+
+    def __str__(self):
+        return self.name
+
+
+def pk_subquery(queryset):
+    """SQL and params selecting the primary keys of queryset"""
+    return queryset.order_by().values('pk').query.sql_with_params()
+
+
+TABLES = {
+    name: connection.ops.quote_name(model._meta.db_table)
+    for name, model in (
+        ('jobcard', JobCard),
+        ('image', JobCardImage),
+        ('upload', ImageUpload),
+        ('item', JobCardItem),
+        ('complaint', Complaint),
+        ('status_change', ItemStatusChange),
+        ('tombstone', FileTombstone),
+        ('archive', ArchivedJobCard),
+    )
+}
+
+# Shared tail of both deletes: detach chunked uploads from the deleted images
+# and queue the images' files for the sweeper
+IMAGE_CLEANUP_SQL = """
+uploads AS (
+    UPDATE {upload} SET image_id = NULL WHERE image_id IN (SELECT images.id FROM images)
+),
+files AS (
+    INSERT INTO {tombstone} (name, created_at)
+    SELECT DISTINCT file.name, NOW()
+    FROM images, unnest(ARRAY[images.image, images.thumbnail, images.medium]) AS file(name)
+    WHERE file.name <> ''
+)"""
+
+DELETE_IMAGES_SQL = ("""
+WITH targets (id) AS MATERIALIZED ({{targets}}),
+images AS (
+    DELETE FROM {image} WHERE {image}.id IN (SELECT targets.id FROM targets)
+    RETURNING {image}.id, {image}.jobcard_id, {image}.image, {image}.thumbnail, {image}.medium
+),""" + IMAGE_CLEANUP_SQL + """
+SELECT images.jobcard_id FROM images
+""").format(**TABLES)
+
+DELETE_JOBCARDS_SQL = ("""
+WITH targets (id) AS MATERIALIZED ({{targets}}),
+images AS (
+    DELETE FROM {image} WHERE {image}.jobcard_id IN (SELECT targets.id FROM targets)
+    RETURNING {image}.id, {image}.jobcard_id, {image}.image, {image}.thumbnail, {image}.medium
+),
+complaints AS (
+    DELETE FROM {complaint} WHERE {complaint}.item_id IN (
+        SELECT {item}.id FROM {item} WHERE {item}.jobcard_id IN (SELECT targets.id FROM targets)
+    )
+),
+items AS (
+    DELETE FROM {item} WHERE {item}.jobcard_id IN (SELECT targets.id FROM targets)
+),
+status_changes AS (
+    DELETE FROM {status_change} WHERE {status_change}.jobcard_id IN (SELECT targets.id FROM targets)
+),
+jobcards AS (
+    DELETE FROM {jobcard} WHERE {jobcard}.id IN (SELECT targets.id FROM targets)
+    RETURNING {jobcard}.id, {jobcard}.ticket_no
+),""" + IMAGE_CLEANUP_SQL + """
+SELECT jobcards.id, jobcards.ticket_no FROM jobcards
+""").format(**TABLES)
+
+# Copy job cards into the archive with their images and status history as
+# JSON; the caller deletes the hot rows with delete_with_files() afterwards
+ARCHIVE_JOBCARDS_SQL = ("""
+INSERT INTO {archive} (
+    id, ticket_no, customer, address, phone, items_data, item_names, worst_status,
+    images, status_history, search_vector, created_at, updated_at, archived_at
+)
+SELECT {jobcard}.id, {jobcard}.ticket_no, {jobcard}.customer, {jobcard}.address, {jobcard}.phone,
+       {jobcard}.items_data, {jobcard}.item_names, {jobcard}.worst_status,
+       COALESCE((
+           SELECT jsonb_agg(jsonb_build_object(
+               'item_index', {image}.item_index, 'complaint_index', {image}.complaint_index,
+               'image', {image}.image, 'thumbnail', {image}.thumbnail, 'medium', {image}.medium
+           ) ORDER BY {image}.item_index, {image}.complaint_index, {image}.uploaded_at, {image}.id)
+           FROM {image} WHERE {image}.jobcard_id = {jobcard}.id
+       ), '[]'::jsonb),
+       COALESCE((
+           SELECT jsonb_agg(jsonb_build_object(
+               'position', {status_change}.position, 'status', {status_change}.status,
+               'changed_at', {status_change}.changed_at
+           ) ORDER BY {status_change}.position, {status_change}.changed_at, {status_change}.id)
+           FROM {status_change} WHERE {status_change}.jobcard_id = {jobcard}.id
+       ), '[]'::jsonb),
+       {jobcard}.search_vector, {jobcard}.created_at, {jobcard}.updated_at, NOW()
+FROM {jobcard}
+WHERE {jobcard}.id = ANY(%s)
+""").format(**TABLES)
@@ -0,0 +1,77 @@
+"""Dashboard figures, aggregated in PostgreSQL from the normalized item rows"""
+from datetime import datetime, time, timedelta
+
+from django.db import connection
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import ItemStatusChange, JobCard, JobCardItem
+
+# Length of every status period; the open period of an item still present runs until now
+STATUS_DURATION_SQL = f"""
+SELECT status, AVG(EXTRACT(EPOCH FROM ended_at - changed_at)), COUNT(ended_at)
+FROM (
+    SELECT change.status, change.changed_at,
+           COALESCE(
+               LEAD(change.changed_at) OVER (
+                   PARTITION BY change.jobcard_id, change.position ORDER BY change.changed_at, change.id
+               ),
+               CASE WHEN EXISTS (
+                   SELECT 1 FROM {JobCardItem._meta.db_table} item
+                   WHERE item.jobcard_id = change.jobcard_id AND item.position = change.position
+               ) THEN NOW() END
+           ) AS ended_at
+    FROM {ItemStatusChange._meta.db_table} change
+) periods
+WHERE ended_at IS NOT NULL
+GROUP BY status
+"""
+
+
+def count_by(queryset, field):
+    return dict(queryset.values_list(field).annotate(count=Count('pk')).order_by())
+
+
+def average_status_durations():
+    """{status: {'avg_seconds', 'periods'}} over all recorded status periods"""
+    with connection.cursor() as cursor:
+        cursor.execute(STATUS_DURATION_SQL)
+        rows = cursor.fetchall()
+    return {
+        status: {'avg_seconds': round(float(seconds), 1), 'periods': periods}
+        for status, seconds, periods in rows
+    }
+
+
+def build_dashboard_stats(days):
+    """Counts per item status and item type, job cards per day for the last days days, time in status"""
+    items_by_status = count_by(JobCardItem.objects.all(), 'status')
+    items_by_type = count_by(JobCardItem.objects.all(), 'item')
+    since = timezone.localdate() - timedelta(days=days - 1)
+    per_day = (
+        JobCard.objects.filter(created_at__gte=timezone.make_aware(datetime.combine(since, time.min)))
+        .annotate(day=TruncDate('created_at'))
+        .values_list('day')
+        .annotate(count=Count('pk'))
+        .order_by('day')
+    )
+    durations = average_status_durations()
+
+    # Known statuses and item types are always listed, unknown item names roll up into Other
+    by_type = {item_type: 0 for item_type in JobCard.ITEM_TYPES}
+    for item_type, count in items_by_type.items():
+        key = item_type if item_type in by_type else 'Other'
+        by_type[key] += count
+    return {
+        'total_jobcards': JobCard.objects.count(),
+        'jobcards_by_worst_status': count_by(JobCard.objects.exclude(worst_status=''), 'worst_status'),
+        'items_by_status': {status: items_by_status.get(status, 0) for status, _ in JobCard.STATUS_CHOICES},
+        'items_by_type': by_type,
+        'jobcards_per_day': [{'date': day.isoformat(), 'count': count} for day, count in per_day],
+        'time_in_status': {
+            status: durations.get(status, {'avg_seconds': None, 'periods': 0})
+            for status, _ in JobCard.STATUS_CHOICES
+        },
+        'generated_at': timezone.now().isoformat(),
+    }
@@ -0,0 +1,88 @@
+import hashlib
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+from django.utils.functional import cached_property
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """File system storage that names every file after the SHA-256 of its content.
+
+    Saving bytes that are already stored returns the existing name instead of
+    writing a second copy, so identical uploads share one blob on disk. Blobs
+    are shared between rows, so callers must not delete them directly; see
+    JobCardImageQuerySet.release_files().
+    """
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        digest = digest.hexdigest()
+        directory = os.path.dirname(name)
+        extension = os.path.splitext(name)[1].lower()[:5]
+        blob_name = os.path.join(directory, digest[:2], f"{digest}{extension}")
+        return super().save(blob_name, content, max_length=max_length)
+
+    def restore(self, name, content):
+        """Write content back under an existing blob name (its content address)"""
+        return self._save(name, content)
+
+    def get_available_name(self, name, max_length=None):
+        # The name identifies the content, so an existing file is the same file
+        return name
+
+    def _save(self, name, content):
+        full_path = self.path(name)
+        if os.path.exists(full_path):
+            return name
+        directory = os.path.dirname(full_path)
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.upload-')
+        try:
+            with os.fdopen(fd, 'wb') as temp_file:
+                for chunk in content.chunks():
+                    temp_file.write(chunk.encode() if isinstance(chunk, str) else chunk)
+            if self.file_permissions_mode is not None:
+                os.chmod(temp_path, self.file_permissions_mode)
+            try:
+                # link() fails instead of overwriting when a concurrent writer won
+                os.link(temp_path, full_path)
+            except FileExistsError:
+                pass
+        finally:
+            os.unlink(temp_path)
+        return name
+
+
+@deconstructible
+class ColdStorage(ContentAddressedStorage):
+    """Content-addressed storage for the images of archived job cards.
+
+    Lives in JOBCARD_COLD_MEDIA_ROOT (default: MEDIA_ROOT/cold), which can
+    point at a cheaper volume. A hot blob keeps its name when copied here,
+    because the name is derived from the content.
+    """
+
+    @cached_property
+    def base_location(self):
+        return getattr(settings, 'JOBCARD_COLD_MEDIA_ROOT', None) or os.path.join(settings.MEDIA_ROOT, 'cold')
+
+    @cached_property
+    def base_url(self):
+        url = getattr(settings, 'JOBCARD_COLD_MEDIA_URL', None) or f"{settings.MEDIA_URL}cold/"
+        return url if url.endswith('/') else f"{url}/"
+
+
+blob_storage = ContentAddressedStorage()
+cold_storage = ColdStorage()
@@ -0,0 +1,157 @@
+"""Small database-backed task queue for work that should not block a request.
+
+Tasks are rows in BackgroundTask, inserted in the caller's transaction, so
+they exist exactly when the data they refer to was committed. What happens
+next depends on settings.JOBCARD_TASK_MODE:
+
+* ``'thread'`` (default): run on an in-process thread pool once the
+  transaction commits. Rows left behind by a crash are picked up by
+  ``manage.py run_tasks``.
+* ``'worker'``: only ``manage.py run_tasks`` runs them.
+* ``'sync'``: run inline right after commit (tests, debugging).
+"""
+import logging
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 3
+RETRY_DELAY = timedelta(seconds=30)
+# A task still marked running after this long is assumed to have died with its process
+STALE_AFTER = timedelta(minutes=10)
+
+_registry = {}
+_executor = None
+
+
+def task(func):
+    """Register func so it can be queued by name with enqueue()"""
+    _registry[func.__name__] = func
+    return func
+
+
+def get_mode():
+    return getattr(settings, 'JOBCARD_TASK_MODE', 'thread')
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'JOBCARD_TASK_THREADS', 2),
+            thread_name_prefix='jobcard-task',
+        )
+    return _executor
+
+
+def _run_in_thread(task_id):
+    try:
+        run_task(task_id)
+    finally:
+        close_old_connections()
+        connection.close()
+
+
+def enqueue(name, **payload):
+    """Queue a registered task; it runs only if the surrounding transaction commits"""
+    from .models import BackgroundTask
+
+    if name not in _registry:
+        raise ValueError(f"Unknown task: {name}")
+    background_task = BackgroundTask.objects.create(name=name, payload=payload)
+    mode = get_mode()
+    if mode == 'thread':
+        transaction.on_commit(lambda: _get_executor().submit(_run_in_thread, background_task.pk))
+    elif mode == 'sync':
+        transaction.on_commit(lambda: run_task(background_task.pk))
+    return background_task
+
+
+def claim_task(task_id=None):
+    """Mark the next runnable task (or task_id) as running, skipping rows other workers hold"""
+    from .models import BackgroundTask
+
+    with transaction.atomic():
+        tasks = BackgroundTask.objects.select_for_update(skip_locked=True).filter(
+            status=BackgroundTask.PENDING, run_after__lte=timezone.now(),
+        )
+        if task_id is not None:
+            tasks = tasks.filter(pk=task_id)
+        background_task = tasks.first()
+        if background_task is None:
+            return None
+        background_task.status = BackgroundTask.RUNNING
+        background_task.attempts += 1
+        background_task.started_at = timezone.now()
+        background_task.save(update_fields=['status', 'attempts', 'started_at'])
+    return background_task
+
+
+def execute(background_task):
+    """Run a claimed task; successful tasks are deleted, failures retried then kept as failed"""
+    from .models import BackgroundTask
+
+    try:
+        _registry[background_task.name](**background_task.payload)
+    except Exception:
+        logger.exception("Task %s (%s) failed", background_task.pk, background_task.name)
+        background_task.last_error = traceback.format_exc()
+        if background_task.attempts >= MAX_ATTEMPTS:
+            background_task.status = BackgroundTask.FAILED
+        else:
+            background_task.status = BackgroundTask.PENDING
+            background_task.run_after = timezone.now() + RETRY_DELAY * background_task.attempts
+        background_task.save(update_fields=['status', 'last_error', 'run_after'])
+        return False
+    BackgroundTask.objects.filter(pk=background_task.pk).delete()
+    return True
+
+
+def run_task(task_id):
+    background_task = claim_task(task_id)
+    if background_task is None:
+        return None
+    return execute(background_task)
+
+
+def requeue_stale_tasks():
+    from .models import BackgroundTask
+
+    return BackgroundTask.objects.filter(
+        status=BackgroundTask.RUNNING, started_at__lt=timezone.now() - STALE_AFTER,
+    ).update(status=BackgroundTask.PENDING)
+
+
+def run_pending(limit=None):
+    """Run queued tasks until none are due (or limit is reached); returns (succeeded, failed)"""
+    succeeded = failed = 0
+    while limit is None or succeeded + failed < limit:
+        background_task = claim_task()
+        if background_task is None:
+            break
+        if execute(background_task):
+            succeeded += 1
+        else:
+            failed += 1
+    return succeeded, failed
+
+
+@task
+def generate_image_variants(image_ids):
+    from .models import JobCardImage
+
+    for image in JobCardImage.objects.filter(pk__in=image_ids).exclude(image=''):
+        image.generate_variants()
+
+
+@task
+def sweep_file_tombstones():
+    from .models import FileTombstone
+
+    FileTombstone.objects.sweep()
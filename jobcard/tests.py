@@ -1,3 +1,1278 @@
-from django.test import TestCase
+import asyncio
+import csv
+import importlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.apps import apps as django_apps
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, transaction
+from django.http import QueryDict, StreamingHttpResponse
+from django.template.base import Template
+from django.test import AsyncClient, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.html import escape
+from PIL import Image
+
+from . import archive, importer, metrics, tasks, views
+from .models import (
+    ArchivedJobCard, BackgroundTask, Complaint, FileTombstone, ImageUpload, ImportCheckpoint, ItemStatusChange,
+    JobCard, JobCardChange, JobCardImage, JobCardItem, unsaved_files,
+)
+from .storage import blob_storage, cold_storage
+from .tickets import TicketNumberBlock, reserve_ticket_numbers
+
+
+def make_jobcard(index, item_count=2):
+    items_data = [
+        {
+            'item': 'Laptop',
+            'serial': f'SN{index}-{item_idx}',
+            'config': '',
+            'status': 'logged',
+            'complaints': [
+                {'description': 'Screen flickering', 'notes': ''},
+                {'description': 'Battery not charging', 'notes': ''},
+            ],
+        }
+        for item_idx in range(item_count)
+    ]
+    return JobCard.objects.create(
+        customer=f'Customer {index}',
+        address='Shop road',
+        phone=f'98765{index:05d}',
+        items_data=items_data,
+    )
+
+
+def make_photo(size=(64, 48), name='photo.jpg', color=(200, 40, 40)):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, color=color).save(buffer, format='JPEG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/jpeg')
+
+
+def add_image(jobcard, item_index, complaint_index, photo=None):
+    return JobCardImage.objects.create(
+        jobcard=jobcard,
+        image=photo or make_photo(),
+        item_index=item_index,
+        complaint_index=complaint_index,
+    )
+
+
+class MediaRootMixin:
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls._media_root = tempfile.mkdtemp()
+        cls._media_override = override_settings(MEDIA_ROOT=cls._media_root, JOBCARD_TASK_MODE='sync')
+        cls._media_override.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._media_override.disable()
+        shutil.rmtree(cls._media_root, ignore_errors=True)
+        super().tearDownClass()
+
+
+class JobCardImagePrefetchTests(MediaRootMixin, TestCase):
+    def create_tickets(self, count):
+        for index in range(count):
+            jobcard = make_jobcard(index)
+            for item_index in range(2):
+                for complaint_index in range(2):
+                    add_image(jobcard, item_index, complaint_index)
+
+    def count_list_queries(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse('jobcard_list'))
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries)
+
+    def test_list_query_count_is_constant(self):
+        self.create_tickets(2)
+        few = self.count_list_queries()
+        self.create_tickets(10)
+        many = self.count_list_queries()
+        self.assertEqual(few, many)
+
+    def test_images_grouped_by_item_and_complaint(self):
+        jobcard = make_jobcard(1)
+        first = add_image(jobcard, 0, 1)
+        second = add_image(jobcard, 1, 0)
+
+        jobcard = JobCard.objects.with_images().get(pk=jobcard.pk)
+        with self.assertNumQueries(0):
+            grouped = jobcard.get_images_by_complaint()
+            by_item = jobcard.get_images_by_item()
+
+        self.assertEqual(grouped, {(0, 1): [first], (1, 0): [second]})
+        self.assertEqual(by_item, {0: [first], 1: [second]})
+
+    def test_detail_api_uses_single_image_query(self):
+        jobcard = make_jobcard(1, item_count=5)
+        for item_index in range(5):
+            add_image(jobcard, item_index, 0)
+
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('api_jobcard_detail', args=[jobcard.pk]))
+
+        items = response.json()['items']
+        self.assertEqual(len(items), 5)
+        self.assertEqual(len(items[4]['complaints'][0]['images']), 1)
+        self.assertEqual(items[4]['complaints'][1]['images'], [])
+
+
+class JobCardDetailCacheTests(MediaRootMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def get_detail(self, jobcard, **headers):
+        return self.client.get(reverse('api_jobcard_detail', args=[jobcard.pk]), headers=headers)
+
+    def test_repeat_polls_are_answered_from_cache(self):
+        jobcard = make_jobcard(1)
+        response = self.get_detail(jobcard)
+        etag = response['ETag']
+        self.assertTrue(response.has_header('Last-Modified'))
+
+        with self.assertNumQueries(0):
+            not_modified = self.get_detail(jobcard, if_none_match=etag)
+            cached = self.get_detail(jobcard)
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(cached.json(), response.json())
+
+    def test_status_and_image_changes_invalidate(self):
+        jobcard = make_jobcard(1)
+        etag = self.get_detail(jobcard)['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            JobCard.objects.set_item_status(jobcard.pk, 0, 'completed')
+        response = self.get_detail(jobcard, if_none_match=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['items'][0]['status'], 'completed')
+
+        etag = response['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            image = add_image(jobcard, 1, 0)
+        response = self.get_detail(jobcard, if_none_match=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['items'][1]['complaints'][0]['images'][0]['id'], image.pk)
+
+
+class JobCardListApiTests(TestCase):
+    def get_list(self, **params):
+        response = self.client.get(reverse('api_jobcard_list'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_cursor_walks_every_row_once_with_selected_fields(self):
+        jobcards = [make_jobcard(index) for index in range(7)]
+        # Rows sharing a created_at are ordered by id
+        JobCard.objects.filter(pk__in=[jobcard.pk for jobcard in jobcards[2:5]]).update(
+            created_at=jobcards[2].created_at,
+        )
+
+        seen = []
+        params = {'page_size': 3, 'fields': 'ticket_no,phone'}
+        with self.assertNumQueries(1):
+            page = self.get_list(**params)
+        while True:
+            self.assertEqual(set(page['results'][0]), {'id', 'ticket_no', 'phone'})
+            seen.extend(row['id'] for row in page['results'])
+            if not page['next_cursor']:
+                break
+            page = self.get_list(cursor=page['next_cursor'], **params)
+
+        expected = list(JobCard.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        self.assertEqual(seen, expected)
+
+    def test_updated_since_and_invalid_parameters(self):
+        old, recent = make_jobcard(1), make_jobcard(2)
+        JobCard.objects.filter(pk=old.pk).update(updated_at=timezone.now() - timedelta(days=2))
+        since = (timezone.now() - timedelta(days=1)).isoformat()
+        results = self.get_list(updated_since=since)['results']
+        self.assertEqual([row['id'] for row in results], [recent.pk])
+
+        for params in ({'fields': 'customer,secret'}, {'cursor': 'garbage'}, {'updated_since': 'yesterday'}):
+            response = self.client.get(reverse('api_jobcard_list'), params)
+            self.assertEqual(response.status_code, 400)
+
+
+class JobCardListPageTests(TestCase):
+    def setUp(self):
+        self.jobcards = [make_jobcard(index) for index in range(5)]
+        # Newest first: jobcards[0] is the most recent
+        now = timezone.now()
+        for age, jobcard in enumerate(self.jobcards):
+            JobCard.objects.filter(pk=jobcard.pk).update(created_at=now - timedelta(days=age))
+
+    def get_list(self, **params):
+        response = self.client.get(reverse('jobcard_list'), params)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def listed(self, **params):
+        return [jobcard.pk for jobcard in self.get_list(**params).context['jobcards']]
+
+    def test_page_size_and_page_number(self):
+        pks = [jobcard.pk for jobcard in self.jobcards]
+        self.assertEqual(self.listed(page_size=2), pks[:2])
+        self.assertEqual(self.listed(page_size=2, page=2), pks[2:4])
+        self.assertEqual(self.listed(page_size=2, page=3), pks[4:])
+        # Out of range and invalid values fall back to the last page and the default size
+        self.assertEqual(self.listed(page_size=2, page=9), pks[4:])
+        self.assertEqual(self.listed(page_size='many'), pks)
+        self.assertEqual(self.get_list(page_size=1000).context['paginator'].per_page, views.JOBCARD_MAX_PAGE_SIZE)
+
+    def test_each_filter_on_its_own(self):
+        pending = self.jobcards[3]
+        JobCard.objects.set_item_status(pending.pk, 1, 'pending')
+        day = (timezone.localtime() - timedelta(days=2)).date().isoformat()
+
+        cases = [
+            ({'search': self.jobcards[1].phone}, [self.jobcards[1].pk]),
+            ({'status': 'pending'}, [pending.pk]),
+            ({'date_from': day}, [jobcard.pk for jobcard in self.jobcards[:3]]),
+            ({'date_to': day}, [jobcard.pk for jobcard in self.jobcards[2:]]),
+            ({'date_from': day, 'date_to': day}, [self.jobcards[2].pk]),
+        ]
+        for params, expected in cases:
+            with self.subTest(params=params):
+                response = self.get_list(**params)
+                self.assertEqual([jobcard.pk for jobcard in response.context['jobcards']], expected)
+                self.assertTrue(response.context['is_filtered'])
+        # Unparseable dates are ignored
+        self.assertEqual(self.listed(date_from='someday'), [jobcard.pk for jobcard in self.jobcards])
+
+    def test_pagination_links_keep_the_filters(self):
+        response = self.get_list(search='Customer', status='logged', page_size=2, page=2)
+        query_string = response.context['query_string']
+        self.assertEqual(
+            dict(QueryDict(query_string).items()),
+            {'search': 'Customer', 'status': 'logged', 'page_size': '2'},
+        )
+        for page in (1, 3):
+            self.assertContains(response, f'href="?{escape(query_string)}&page={page}"')
+
+
+class JobCardExportTests(TestCase):
+    def export(self, **params):
+        response = self.client.get(reverse('jobcard_export'), params)
+        self.assertEqual(response.status_code, 200)
+        self.assertIsInstance(response, StreamingHttpResponse)
+        self.assertFalse(response.is_async)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertIn('attachment; filename="jobcards-', response['Content-Disposition'])
+        return list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))
+
+    def test_one_row_per_item_complaint_after_the_header(self):
+        jobcard = make_jobcard(1)
+        JobCard.objects.set_item_status(jobcard.pk, 1, 'sent_technician')
+        jobcard.refresh_from_db()
+        created = timezone.localtime(jobcard.created_at).strftime('%d/%m/%Y %H:%M')
+        ticket = [jobcard.ticket_no, created, 'Customer 1', '9876500001', 'Shop road']
+
+        rows = self.export()
+        self.assertEqual(rows, [
+            views.EXPORT_HEADER,
+            ticket + ['Laptop', 'SN1-0', '', 'Logged', 'Laptop: Screen flickering', ''],
+            ticket + ['Laptop', 'SN1-0', '', 'Logged', 'Laptop: Battery not charging', ''],
+            ticket + ['Laptop', 'SN1-1', '', 'Sent To Technician', 'Laptop: Screen flickering', ''],
+            ticket + ['Laptop', 'SN1-1', '', 'Sent To Technician', 'Laptop: Battery not charging', ''],
+        ])
+
+    def test_job_card_without_items_still_gets_a_row(self):
+        jobcard = make_jobcard(1, item_count=0)
+        rows = self.export()
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[1][0], jobcard.ticket_no)
+        self.assertEqual(rows[1][5:], [''] * 6)
+
+    async def test_streams_asynchronously_under_asgi(self):
+        jobcards = [await sync_to_async(make_jobcard)(index) for index in range(3)]
+        response = await AsyncClient().get(reverse('jobcard_export'))
+        self.assertEqual(response.status_code, 200)
+        # A sync iterator would be collected into a list before the first byte went out
+        self.assertTrue(response.is_async)
+        content = b''.join([chunk async for chunk in response.streaming_content])
+        rows = list(csv.reader(io.StringIO(content.decode())))
+        self.assertEqual(rows[0], views.EXPORT_HEADER)
+        self.assertEqual(len(rows), 1 + 3 * 4)
+        self.assertEqual({row[0] for row in rows[1:]}, {jobcard.ticket_no for jobcard in jobcards})
+
+    def test_list_filters_apply(self):
+        first, second, third = (make_jobcard(index, item_count=1) for index in (1, 2, 3))
+        JobCard.objects.set_item_status(second.pk, 0, 'pending')
+        JobCard.objects.filter(pk=third.pk).update(created_at=timezone.now() - timedelta(days=3))
+        yesterday = (timezone.localdate() - timedelta(days=1)).isoformat()
+
+        cases = [
+            ({'search': first.phone}, {first.ticket_no}),
+            ({'status': 'pending'}, {second.ticket_no}),
+            ({'date_from': yesterday}, {first.ticket_no, second.ticket_no}),
+            ({'date_to': yesterday}, {third.ticket_no}),
+        ]
+        for params, expected in cases:
+            with self.subTest(params=params):
+                rows = self.export(**params)
+                self.assertEqual(rows[0], views.EXPORT_HEADER)
+                self.assertEqual({row[0] for row in rows[1:]}, expected)
+
+
+class JobCardSearchTests(TestCase):
+    def setUp(self):
+        self.ravi = JobCard.objects.create(
+            customer='Ravi Kumar', address='Main road', phone='9811122233',
+            items_data=[{'item': 'Laptop', 'serial': 'ABC-123', 'status': 'logged',
+                         'complaints': [{'description': 'No display', 'notes': ''}]}],
+        )
+        self.stores = JobCard.objects.create(
+            customer='Kumar Stores', address='Market street', phone='9744455566',
+            items_data=[{'item': 'Printer', 'serial': 'SN1-0', 'status': 'logged',
+                         'complaints': [{'description': 'Sent by Ravi for toner', 'notes': ''}]}],
+        )
+
+    def search(self, text):
+        return list(JobCard.objects.search(text).order_by('-rank', '-created_at'))
+
+    def test_customer_match_outranks_complaint_match(self):
+        self.assertEqual(self.search('ravi'), [self.ravi, self.stores])
+
+    def test_words_match_as_prefixes(self):
+        self.assertEqual(self.search('lap'), [self.ravi])
+        self.assertEqual(self.search('kum sto'), [self.stores])
+
+    def test_hyphenated_serials(self):
+        for text in ('ABC-123', 'abc-12', 'SN1-0', '123'):
+            with self.subTest(text=text):
+                expected = [self.stores] if text == 'SN1-0' else [self.ravi]
+                self.assertEqual(self.search(text), expected)
+
+    def test_partial_phone_and_ticket_number(self):
+        self.assertEqual(self.search('98111'), [self.ravi])
+        self.assertEqual(self.search(self.stores.ticket_no.lower()), [self.stores])
+        self.assertEqual(self.search(self.stores.ticket_no[-4:]), [self.stores])
+
+    def test_list_page_filter_uses_search(self):
+        response = self.client.get(reverse('jobcard_list'), {'search': 'SN1-0'})
+        self.assertEqual(list(response.context['jobcards']), [self.stores])
+
+
+class ListIndexTests(TestCase):
+    def setUp(self):
+        for index in range(3):
+            make_jobcard(index)
+        # The test tables are tiny; make the planner show which index it would use at scale
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+
+    def assertUsesIndex(self, queryset, index_name):
+        plan = queryset.explain()
+        self.assertIn(index_name, plan, plan)
+
+    def test_list_filters_use_their_indexes(self):
+        today = timezone.localdate().isoformat()
+        cases = [
+            (JobCard.objects.all()[:25], 'jobcard_created_at_idx'),
+            (views.filter_jobcards(JobCard.objects.all(), {'date_from': today, 'date_to': today}),
+             'jobcard_created_at_idx'),
+            # Unordered, so the planner does not walk jobcard_created_at_idx for the ordering instead
+            (views.filter_jobcards(JobCard.objects.order_by(), {'phone': '9876500001'}), 'jobcard_phone_idx'),
+            (views.filter_jobcards(JobCard.objects.order_by(), {'item': 'Laptop'}), 'jobcard_items_data_idx'),
+            (JobCardImage.objects.filter(jobcard_id__in=[1, 2, 3]), 'jobcardimage_slot_idx'),
+        ]
+        for queryset, index_name in cases:
+            with self.subTest(index_name=index_name):
+                self.assertUsesIndex(queryset, index_name)
+
+
+# The feed only reports committed transactions, which TestCase's wrapping transaction never is
+class ChangeFeedTests(TransactionTestCase):
+    def get_changes(self, cursor, timeout=0):
+        response = self.client.get(reverse('api_jobcard_changes'), {'cursor': cursor, 'timeout': timeout})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_reports_created_updated_and_deleted_since_cursor(self):
+        unchanged, updated, deleted = make_jobcard(1), make_jobcard(2), make_jobcard(3)
+        cursor = views.get_feed_cursor()
+
+        JobCard.objects.set_item_status(updated.pk, 0, 'completed')
+        deleted_pk = deleted.pk
+        deleted.delete()
+        created = make_jobcard(4)
+
+        feed = self.get_changes(cursor)
+        changes = {change['id']: change for change in feed['changes']}
+        self.assertEqual(set(changes), {updated.pk, created.pk, deleted_pk})
+        self.assertEqual(changes[updated.pk]['type'], 'updated')
+        self.assertIn('status-completed', changes[updated.pk]['html'])
+        self.assertEqual(changes[created.pk]['type'], 'created')
+        self.assertEqual(changes[deleted_pk]['type'], 'deleted')
+        self.assertNotIn(unchanged.pk, changes)
+
+        self.assertEqual(self.get_changes(feed['cursor'])['changes'], [])
+
+    def test_slow_transaction_is_reported_once_committed(self):
+        cursor = views.get_feed_cursor()
+        started, finish = threading.Event(), threading.Event()
+        slow = {}
+
+        def create_slowly():
+            # Stands in for a create that spends a while saving large photos
+            try:
+                with transaction.atomic():
+                    slow['jobcard'] = make_jobcard(1)
+                    started.set()
+                    finish.wait(10)
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=create_slowly)
+        thread.start()
+        try:
+            self.assertTrue(started.wait(10))
+            fast = make_jobcard(2)
+            # Meanwhile polls report nothing, not even the later fast commit, and hold the cursor back
+            feed = self.get_changes(cursor)
+            self.assertEqual(feed['changes'], [])
+            time.sleep(0.5)
+            feed = self.get_changes(feed['cursor'])
+            self.assertEqual(feed['changes'], [])
+        finally:
+            finish.set()
+            thread.join()
+
+        feed = self.get_changes(feed['cursor'])
+        self.assertEqual(
+            {(change['id'], change['type']) for change in feed['changes']},
+            {(slow['jobcard'].pk, 'created'), (fast.pk, 'created')},
+        )
+        self.assertEqual(self.get_changes(feed['cursor'])['changes'], [])
+
+    @override_settings(JOBCARD_FEED_LONG_POLL=True)
+    async def test_waiting_polls_do_not_block_each_other(self):
+        cursor = await sync_to_async(views.get_feed_cursor)()
+        client = AsyncClient()
+        started = time.monotonic()
+        with mock.patch('jobcard.views.FEED_POLL_INTERVAL', 0.1):
+            responses = await asyncio.gather(*(
+                client.get(reverse('api_jobcard_changes'), {'cursor': cursor, 'timeout': 0.5})
+                for _ in range(10)
+            ))
+        self.assertGreaterEqual(time.monotonic() - started, 0.5)
+        self.assertLess(time.monotonic() - started, 3)
+        self.assertTrue(all(response.json()['changes'] == [] for response in responses))
+
+    def test_list_page_carries_feed_cursor(self):
+        make_jobcard(1)
+        response = self.client.get(reverse('jobcard_list'))
+        self.assertIn(f"let feedCursor = {response.context['feed_cursor']};", response.content.decode())
+
+    def test_polls_do_not_wait_without_long_polling(self):
+        # The default WSGI setup must not hold a worker per open list page
+        response = self.client.get(reverse('jobcard_list'))
+        self.assertIn("const feedTimeout = 0;", response.content.decode())
+
+        started = time.monotonic()
+        self.assertEqual(self.get_changes(views.get_feed_cursor(), timeout=30)['changes'], [])
+        self.assertLess(time.monotonic() - started, 1)
+
+
+class ImageVariantTests(MediaRootMixin, TestCase):
+    def test_variants_are_generated_and_exposed(self):
+        jobcard = make_jobcard(1)
+        with self.captureOnCommitCallbacks(execute=True):
+            image = add_image(jobcard, 0, 0, photo=make_photo(size=(3000, 2000)))
+        image.refresh_from_db()
+        self.assertFalse(BackgroundTask.objects.exists())
+
+        with Image.open(image.thumbnail.path) as thumbnail:
+            self.assertLessEqual(max(thumbnail.size), 240)
+        with Image.open(image.medium.path) as medium:
+            self.assertEqual(medium.size, (1280, 853))
+
+        response = self.client.get(reverse('api_jobcard_detail', args=[jobcard.pk]))
+        payload = response.json()['items'][0]['complaints'][0]['images'][0]
+        self.assertEqual(payload['thumbnail_url'], image.thumbnail.url)
+        self.assertEqual(payload['medium_url'], image.medium.url)
+
+        paths = [image.image.path, image.thumbnail.path, image.medium.path]
+        with self.captureOnCommitCallbacks(execute=True):
+            image.delete()
+            self.assertTrue(all(os.path.exists(path) for path in paths))
+        self.assertFalse(any(os.path.exists(path) for path in paths))
+
+    def test_unreadable_upload_falls_back_to_original(self):
+        jobcard = make_jobcard(1)
+        with self.assertLogs('jobcard.images', level='WARNING'), self.captureOnCommitCallbacks(execute=True):
+            image = add_image(jobcard, 0, 0, photo=SimpleUploadedFile('broken.jpg', b'not-a-jpeg'))
+        image.refresh_from_db()
+        self.assertFalse(image.thumbnail)
+        self.assertEqual(image.thumbnail_url, image.image.url)
+
+
+class ContentAddressedStorageTests(MediaRootMixin, TestCase):
+    def test_identical_uploads_share_one_blob_until_last_reference_goes(self):
+        jobcard = make_jobcard(1)
+        with self.captureOnCommitCallbacks(execute=True):
+            first = add_image(jobcard, 0, 0, photo=make_photo(name='IMG_0001.jpg'))
+            second = add_image(jobcard, 1, 0, photo=make_photo(name='IMG_0001_copy.jpg'))
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertEqual(first.thumbnail.name, second.thumbnail.name)
+        path = first.image.path
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertTrue(os.path.exists(path))
+        self.assertTrue(os.path.exists(second.thumbnail.path))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            JobCardImage.objects.filter(pk=second.pk).delete_with_files()
+        self.assertFalse(os.path.exists(path))
+        self.assertFalse(os.path.exists(second.thumbnail.path))
+
+    def test_pin_restores_blob_released_before_commit(self):
+        jobcard = make_jobcard(1)
+        image = JobCardImage(jobcard=jobcard, image=make_photo())
+        written = unsaved_files([image])
+        JobCardImage.objects.bulk_create([image])
+        os.remove(image.image.path)
+
+        JobCardImage.objects.pin_files(written)
+        self.assertTrue(os.path.exists(image.image.path))
+
+
+class JobCardFormTests(MediaRootMixin, TestCase):
+    def create_form(self, item_count, photos_per_item):
+        data = {
+            'customer': 'Walk-in',
+            'address': 'Shop road',
+            'phone': '9876543210',
+            'items[]': ['Laptop'] * item_count,
+            'serials[]': [f'SN{index}' for index in range(item_count)],
+            'configs[]': [''] * item_count,
+            'status[]': ['logged'] * item_count,
+        }
+        for index in range(item_count):
+            data[f'complaints-{index}[]'] = ['No display']
+            data[f'images-{index}-0[]'] = [make_photo(name=f'{index}-{n}.jpg') for n in range(photos_per_item)]
+        return data
+
+    def test_create_cost_does_not_grow_with_photos(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post(reverse('jobcard_create'), self.create_form(10, 5))
+        self.assertEqual(response.status_code, 302)
+        self.assertLess(len(context.captured_queries), 15)
+
+        jobcard = JobCard.objects.get()
+        self.assertEqual(jobcard.images.count(), 50)
+        self.assertEqual(jobcard.images.filter(item_index=9, complaint_index=0).count(), 5)
+        self.assertEqual(BackgroundTask.objects.count(), 1)
+
+    def test_edit_removes_discarded_images_in_one_statement(self):
+        jobcard = make_jobcard(1, item_count=1)
+        kept, *discarded = [add_image(jobcard, 0, 0, photo=make_photo(color=(n * 60, 0, 0))) for n in range(4)]
+        data = {
+            'customer': 'Customer 1',
+            'address': 'Shop road',
+            'phone': '9876500001',
+            'items[]': ['Laptop'],
+            'serials[]': ['SN1'],
+            'configs[]': [''],
+            'status-0': 'pending',
+            'complaints-0[]': ['Screen flickering'],
+            'keep_images[]': [str(kept.pk)],
+            'new_images-0[]': [make_photo()],
+        }
+        with CaptureQueriesContext(connection) as context, self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('jobcard_edit', args=[jobcard.pk]), data)
+        self.assertEqual(response.status_code, 302)
+        image_deletes = [q for q in context.captured_queries if 'DELETE FROM "jobcard_jobcardimage"' in q['sql']]
+        self.assertEqual(len(image_deletes), 1)
+
+        self.assertEqual(jobcard.images.count(), 2)
+        self.assertTrue(jobcard.images.filter(pk=kept.pk).exists())
+        self.assertFalse(any(os.path.exists(image.image.path) for image in discarded))
+        jobcard.refresh_from_db()
+        self.assertEqual(jobcard.items_data[0]['status'], 'pending')
+
+
+class ChunkedUploadTests(MediaRootMixin, TestCase):
+    def send_chunk(self, upload_id, offset, chunk):
+        return self.client.patch(
+            reverse('api_upload_detail', args=[upload_id]), chunk,
+            content_type='application/offset+octet-stream', headers={'Upload-Offset': str(offset)},
+        )
+
+    def test_interrupted_upload_resumes_and_attaches_on_create(self):
+        content = make_photo(size=(320, 240)).read()
+        response = self.client.post(reverse('api_upload_create'),
+                                    {'filename': 'bench.jpg', 'size': len(content)}, content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        upload_id = response.json()['id']
+
+        half = len(content) // 2
+        self.assertEqual(self.send_chunk(upload_id, 0, content[:half]).json()['offset'], half)
+        # A retried chunk at a stale offset is refused with the offset to resume from
+        response = self.send_chunk(upload_id, 0, content[:half])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['offset'], half)
+
+        response = self.client.get(reverse('api_upload_detail', args=[upload_id]))
+        response = self.send_chunk(upload_id, response.json()['offset'], content[half:])
+        self.assertTrue(response.json()['complete'])
+        image_id = response.json()['image_id']
+        self.assertFalse(os.path.exists(ImageUpload.objects.get().partial_path))
+
+        response = self.client.post(reverse('jobcard_create'), {
+            'customer': 'Walk-in',
+            'address': 'Shop road',
+            'phone': '9876543210',
+            'items[]': ['Laptop'],
+            'serials[]': ['SN1'],
+            'configs[]': [''],
+            'status[]': ['logged'],
+            'complaints-0[]': ['No display', 'No sound'],
+            'uploaded_images-0-1[]': [str(image_id)],
+        })
+        self.assertEqual(response.status_code, 302)
+        image = JobCardImage.objects.get(pk=image_id)
+        self.assertEqual(image.jobcard, JobCard.objects.get())
+        self.assertEqual((image.item_index, image.complaint_index), (0, 1))
+        with image.image.open('rb') as stored:
+            self.assertEqual(stored.read(), content)
+
+    def test_forms_send_photos_through_the_upload_api(self):
+        jobcard = make_jobcard(1)
+        for url, field in (
+            (reverse('jobcard_create'), 'uploaded_images-${position}-0[]'),
+            (reverse('jobcard_edit', args=[jobcard.pk]), 'uploaded_images-${position}[]'),
+        ):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertContains(response, f"const UPLOAD_URL = '{reverse('api_upload_create')}';")
+                self.assertContains(response, field)
+
+    def test_invalid_image_is_rejected(self):
+        response = self.client.post(reverse('api_upload_create'),
+                                    {'filename': 'notes.jpg', 'size': 4}, content_type='application/json')
+        upload_id = response.json()['id']
+        response = self.send_chunk(upload_id, 0, b'text')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(ImageUpload.objects.exists())
+        self.assertFalse(JobCardImage.objects.exists())
+
+
+class BulkDeleteTests(MediaRootMixin, TestCase):
+    def test_multi_ticket_delete_is_one_statement_and_sweeps_files_after_commit(self):
+        doomed = [make_jobcard(index) for index in range(3)]
+        kept = make_jobcard(9)
+        images = [add_image(jobcard, 0, 0, photo=make_photo(color=(n * 50 + 50, 0, 0))) for n, jobcard in enumerate(doomed)]
+        shared = add_image(kept, 0, 0, photo=make_photo(color=(0, 0, 0)))
+        add_image(doomed[0], 1, 0, photo=make_photo(color=(0, 0, 0)))
+        paths = [image.image.path for image in images]
+
+        tickets = [jobcard.ticket_no for jobcard in doomed] + ['TK-MISSING']
+        with CaptureQueriesContext(connection) as context, self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.post(reverse('delete_tickets'), {'ticket_nos': tickets},
+                                        content_type='application/json')
+        self.assertEqual(response.json()['not_found'], ['TK-MISSING'])
+        deletes = [query for query in context.captured_queries if 'DELETE FROM' in query['sql']]
+        self.assertEqual(len(deletes), 1)
+        self.assertEqual(list(JobCard.objects.all()), [kept])
+        self.assertEqual(JobCardChange.objects.filter(deleted=True).count(), 3)
+
+        # Files stay until the sweeper runs after commit
+        self.assertTrue(all(os.path.exists(path) for path in paths))
+        self.assertTrue(FileTombstone.objects.exists())
+        for callback in callbacks:
+            callback()
+        self.assertFalse(any(os.path.exists(path) for path in paths))
+        self.assertTrue(os.path.exists(shared.image.path))
+        self.assertFalse(FileTombstone.objects.exists())
+
+    def test_plain_queryset_delete_also_tombstones_files(self):
+        doomed, kept = make_jobcard(1), make_jobcard(2)
+        image = add_image(doomed, 0, 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            result = JobCard.objects.filter(pk=doomed.pk).delete()
+        self.assertEqual(result, (1, {'jobcard.JobCard': 1}))
+        self.assertEqual(list(JobCard.objects.all()), [kept])
+        self.assertFalse(JobCardItem.objects.filter(jobcard_id=doomed.pk).exists())
+        self.assertTrue(JobCardChange.objects.filter(jobcard_id=doomed.pk, deleted=True).exists())
+        self.assertFalse(os.path.exists(image.image.path))
+        with self.assertRaises(TypeError):
+            JobCard.objects.all()[:1].delete()
+
+
+class MediaGarbageCollectionTests(MediaRootMixin, TestCase):
+    def write_orphan(self, name, content=b'orphan', age=timedelta(hours=2)):
+        path = os.path.join(self._media_root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as file:
+            file.write(content)
+        mtime = time.time() - age.total_seconds()
+        os.utime(path, (mtime, mtime))
+        return path
+
+    def run_gc(self, *args):
+        stdout = io.StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('gc_media', *args, '--chunk-size', '2', stdout=stdout)
+        return stdout.getvalue()
+
+    def test_orphans_on_both_sides_are_reported_then_removed(self):
+        jobcard = make_jobcard(1)
+        with self.captureOnCommitCallbacks(execute=True):
+            kept = add_image(jobcard, 0, 0, photo=make_photo(size=(400, 300)))
+            lost = add_image(jobcard, 0, 1, photo=make_photo(color=(0, 90, 0)))
+        kept.refresh_from_db()
+        lost.refresh_from_db()
+        orphans = [self.write_orphan(f'jobcard_images/ab/orphan{n}.jpg') for n in range(3)]
+        fresh = self.write_orphan('jobcard_images/ab/fresh.jpg', age=timedelta())
+        os.remove(lost.image.path)
+        os.remove(kept.thumbnail.path)
+
+        output = self.run_gc('--dry-run')
+        self.assertIn('3 unreferenced', output)
+        self.assertIn('1 without their image file', output)
+        self.assertIn('1 with missing variants', output)
+        self.assertTrue(all(os.path.exists(path) for path in orphans))
+        self.assertTrue(JobCardImage.objects.filter(pk=lost.pk).exists())
+
+        self.run_gc()
+        self.assertFalse(any(os.path.exists(path) for path in orphans))
+        self.assertTrue(os.path.exists(fresh))
+        self.assertTrue(os.path.exists(kept.image.path))
+        self.assertFalse(JobCardImage.objects.filter(pk=lost.pk).exists())
+        kept.refresh_from_db()
+        self.assertTrue(os.path.exists(kept.thumbnail.path))
+
+    def test_repairs_run_per_chunk_not_per_row(self):
+        jobcard = make_jobcard(1)
+        with self.captureOnCommitCallbacks(execute=True):
+            images = [add_image(jobcard, 0, 0, photo=make_photo(color=(n * 40, 0, 0))) for n in range(5)]
+        for image in images:
+            image.refresh_from_db()
+            os.remove(image.thumbnail.path)
+            os.remove(image.medium.path)
+
+        with CaptureQueriesContext(connection) as context:
+            call_command('gc_media', '--chunk-size', '2', stdout=io.StringIO())
+        updates = [q['sql'] for q in context.captured_queries if q['sql'].startswith('UPDATE "jobcard_jobcardimage"')]
+        # Three chunks, one statement per cleared field in each
+        self.assertEqual(len(updates), 6)
+        self.assertEqual(JobCardImage.objects.filter(thumbnail='', medium='').count(), 5)
+
+    def test_rehash_merges_files_saved_before_content_addressing(self):
+        jobcard = make_jobcard(1)
+        same = make_photo().read()
+        other = make_photo(color=(0, 0, 200)).read()
+        legacy = {
+            'jobcard_images/2025/08/7139kie5SL.jpg': same,
+            'jobcard_images/2025/08/7139kie5SL_nzJ5KJb.jpg': same,
+            'jobcard_images/2025/08/BILTON.png': other,
+        }
+        paths = [self.write_orphan(name, content) for name, content in legacy.items()]
+        images = JobCardImage.objects.bulk_create(
+            JobCardImage(jobcard=jobcard, image=name, item_index=0, complaint_index=0) for name in legacy
+        )
+
+        output = self.run_gc('--rehash', '--dry-run')
+        self.assertIn('Found 3 file(s) saved before content addressing', output)
+        self.assertTrue(all(os.path.exists(path) for path in paths))
+
+        self.run_gc('--rehash')
+        names = [JobCardImage.objects.get(pk=image.pk).image.name for image in images]
+        self.assertEqual(names[0], names[1])
+        self.assertNotEqual(names[0], names[2])
+        self.assertTrue(names[2].endswith('.png'))
+        for name, content in zip(names, legacy.values()):
+            self.assertRegex(name, r'^jobcard_images/[0-9a-f]{2}/[0-9a-f]{64}\.(jpg|png)$')
+            with blob_storage.open(name) as blob:
+                self.assertEqual(blob.read(), content)
+        self.assertFalse(any(os.path.exists(path) for path in paths))
+        self.assertFalse(FileTombstone.objects.exists())
+
+
+class ArchiveTests(MediaRootMixin, TestCase):
+    def make_closed(self, index, age=timedelta(days=400)):
+        jobcard = make_jobcard(index)
+        JobCard.objects.bulk_set_item_status([(jobcard.pk, 0, 'completed'), (jobcard.pk, 1, 'returned')])
+        JobCard.objects.filter(pk=jobcard.pk).update(
+            created_at=timezone.now() - age, updated_at=timezone.now() - age,
+        )
+        return jobcard
+
+    def test_closed_tickets_move_to_archive_and_stay_searchable(self):
+        archived = self.make_closed(7)
+        with self.captureOnCommitCallbacks(execute=True):
+            image = add_image(archived, 1, 0)
+        JobCard.objects.filter(pk=archived.pk).update(updated_at=timezone.now() - timedelta(days=400))
+        image.refresh_from_db()
+        recent = self.make_closed(8, age=timedelta(days=10))
+        still_open = make_jobcard(9)
+        JobCard.objects.filter(pk=still_open.pk).update(updated_at=timezone.now() - timedelta(days=400))
+
+        stdout = io.StringIO()
+        call_command('archive_jobcards', '--dry-run', stdout=stdout)
+        self.assertIn('1 job card(s)', stdout.getvalue())
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('archive_jobcards', stdout=io.StringIO())
+
+        self.assertEqual(set(JobCard.objects.values_list('pk', flat=True)), {recent.pk, still_open.pk})
+        self.assertTrue(JobCardChange.objects.filter(jobcard_id=archived.pk, deleted=True).exists())
+        self.assertFalse(os.path.exists(image.image.path))
+        self.assertTrue(os.path.exists(cold_storage.path(image.image.name)))
+
+        row = ArchivedJobCard.objects.get(ticket_no=archived.ticket_no)
+        self.assertEqual(row.pk, archived.pk)
+        self.assertEqual([entry['status'] for entry in row.status_history if entry['position'] == 0],
+                         ['logged', 'completed'])
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT to_regclass(%s)", [archive.partition_name(row.created_at.year)])
+            self.assertIsNotNone(cursor.fetchone()[0])
+
+        response = self.client.get(reverse('api_archive_search'), {'q': 'Customer 7'})
+        self.assertEqual([result['ticket_no'] for result in response.json()['results']], [archived.ticket_no])
+        response = self.client.get(reverse('api_archive_search'), {'q': 'Customer 7', 'date_from': timezone.localdate()})
+        self.assertEqual(response.json()['count'], 0)
+
+        response = self.client.get(reverse('api_archive_detail', args=[archived.ticket_no]))
+        payload = response.json()
+        self.assertTrue(payload['archived'])
+        self.assertEqual([item['status'] for item in payload['items']], ['completed', 'returned'])
+        self.assertEqual(payload['items'][1]['complaints'][0]['images'][0]['url'], cold_storage.url(image.image.name))
+
+
+class BackgroundTaskTests(TestCase):
+    def test_task_only_runs_after_commit(self):
+        calls = []
+
+        @tasks.task
+        def record_call(value):
+            calls.append(value)
+
+        with override_settings(JOBCARD_TASK_MODE='sync'):
+            with self.captureOnCommitCallbacks(execute=False) as callbacks:
+                tasks.enqueue('record_call', value=1)
+            self.assertEqual(calls, [])
+            for callback in callbacks:
+                callback()
+        self.assertEqual(calls, [1])
+        self.assertFalse(BackgroundTask.objects.exists())
+
+    def test_failed_task_is_retried_then_kept(self):
+        @tasks.task
+        def always_fails():
+            raise RuntimeError('boom')
+
+        with override_settings(JOBCARD_TASK_MODE='worker'):
+            background_task = tasks.enqueue('always_fails')
+        for _ in range(tasks.MAX_ATTEMPTS):
+            BackgroundTask.objects.filter(pk=background_task.pk).update(run_after=timezone.now())
+            with self.assertLogs('jobcard.tasks', level='ERROR'):
+                self.assertEqual(tasks.run_pending(), (0, 1))
+
+        background_task.refresh_from_db()
+        self.assertEqual(background_task.status, BackgroundTask.FAILED)
+        self.assertIn('boom', background_task.last_error)
+        self.assertEqual(tasks.run_pending(), (0, 0))
+
+
+class TicketNumberTests(TestCase):
+    def test_create_does_not_query_for_existing_tickets(self):
+        with CaptureQueriesContext(connection) as context:
+            jobcard = make_jobcard(1)
+        self.assertRegex(jobcard.ticket_no, r'^TK-\d{9}$')
+        lookups = [
+            query['sql'] for query in context.captured_queries
+            if query['sql'].startswith('SELECT') and 'FROM "jobcard_jobcard" ' in query['sql']
+        ]
+        self.assertEqual(lookups, [])
+
+    def test_reserved_blocks_are_unique(self):
+        block = TicketNumberBlock(block_size=3)
+        numbers = [next(block) for _ in range(7)] + reserve_ticket_numbers(5)
+        self.assertEqual(len(set(numbers)), 12)
+        self.assertEqual(numbers[:3], sorted(numbers[:3]))
+
+
+class ImportCommandTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+
+    def write(self, name, content):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', newline='') as file:
+            file.write(content)
+        return path
+
+    def run_import(self, path, **options):
+        stdout, stderr = io.StringIO(), io.StringIO()
+        call_command('import_jobcards', path, stdout=stdout, stderr=stderr, **options)
+        return stdout.getvalue(), stderr.getvalue()
+
+    def test_export_round_trips_through_csv_import(self):
+        originals = [make_jobcard(index) for index in range(3)]
+        JobCard.objects.set_item_status(originals[0].pk, 1, 'sent_technician')
+        export = b''.join(self.client.get(reverse('jobcard_export')).streaming_content).decode()
+        expected = {jobcard.ticket_no: jobcard.items_data for jobcard in JobCard.objects.all()}
+        JobCard.objects.all().delete()
+
+        self.run_import(self.write('tickets.csv', export), batch_size=2)
+        imported = {jobcard.ticket_no: jobcard.items_data for jobcard in JobCard.objects.all()}
+        self.assertEqual(imported, expected)
+        self.assertEqual(JobCardItem.objects.filter(status='sent_technician').count(), 1)
+
+    def test_rejects_bad_rows_and_resumes_from_checkpoint(self):
+        records = [
+            {'customer': f'Customer {index}', 'phone': f'98765{index:05d}', 'address': 'Shop road',
+             'created_at': '2024-03-01T10:00:00', 'items': [{'item': 'Printer', 'complaints': [{'description': 'Jam'}]}]}
+            for index in range(5)
+        ]
+        records[1]['items'][0]['status'] = 'lost'
+        lines = [json.dumps(record) for record in records]
+        lines.insert(3, '{not json')
+        path = self.write('tickets.jsonl', '\n'.join(lines) + '\n')
+
+        # Fail while building the fifth record: the batches up to record 3 are already committed
+        real_build = importer.build_jobcard
+        calls = []
+
+        def interrupted(record):
+            calls.append(record)
+            if len(calls) == 5:
+                raise KeyboardInterrupt
+            return real_build(record)
+
+        with mock.patch('jobcard.management.commands.import_jobcards.build_jobcard', interrupted):
+            with self.assertRaises(KeyboardInterrupt):
+                self.run_import(path, batch_size=1)
+        self.assertEqual(JobCard.objects.count(), 2)
+
+        stdout, stderr = self.run_import(path, batch_size=1)
+        self.assertIn('Resuming after record 3', stdout)
+        self.assertIn('Line 4: Invalid JSON', stderr)
+        self.assertEqual(JobCard.objects.count(), 4)
+        self.assertEqual(set(JobCard.objects.values_list('worst_status', flat=True)), {'logged'})
+        self.assertEqual(JobCard.objects.filter(created_at__year=2024).count(), 4)
+        checkpoint = ImportCheckpoint.objects.get()
+        self.assertEqual((checkpoint.position, checkpoint.imported, checkpoint.failed), (6, 4, 2))
+
+
+class ItemStatusUpdateTests(TestCase):
+    def test_update_touches_only_item_status(self):
+        jobcard = make_jobcard(1)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post(
+                reverse('update_status', args=[jobcard.pk]),
+                data={'status': 'pending', 'item_index': 1},
+                content_type='application/json',
+            )
+        self.assertTrue(response.json()['success'])
+        updates = [q['sql'] for q in context.captured_queries if q['sql'].startswith('UPDATE "jobcard_jobcard"')]
+        self.assertEqual(len(updates), 1)
+        self.assertNotIn('"customer"', updates[0])
+
+        jobcard.refresh_from_db()
+        self.assertEqual([item['status'] for item in jobcard.items_data], ['logged', 'pending'])
+        self.assertEqual(jobcard.items.get(position=1).status, 'pending')
+
+    def test_stale_sibling_updates_both_survive(self):
+        jobcard = make_jobcard(1)
+        JobCard.objects.set_item_status(jobcard.pk, 0, 'completed')
+        JobCard.objects.set_item_status(jobcard.pk, 1, 'returned')
+        jobcard.refresh_from_db()
+        self.assertEqual([item['status'] for item in jobcard.items_data], ['completed', 'returned'])
+
+    def test_missing_item_and_invalid_status(self):
+        jobcard = make_jobcard(1)
+        url = reverse('update_status', args=[jobcard.pk])
+        response = self.client.post(url, {'status': 'pending', 'item_index': 5}, content_type='application/json')
+        self.assertEqual(response.status_code, 404)
+        response = self.client.post(url, {'status': 'bogus', 'item_index': 0}, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post(
+            reverse('update_status', args=[jobcard.pk + 1000]),
+            {'status': 'pending', 'item_index': 0}, content_type='application/json',
+        )
+        self.assertEqual(response.json()['error'], 'Job card not found')
+
+
+class ItemRowSyncTests(TestCase):
+    def assertRowsMatchItemsData(self, jobcard):
+        jobcard.refresh_from_db()
+        items = [
+            {
+                'item': item.item,
+                'serial': item.serial,
+                'config': item.config,
+                'status': item.status,
+                'complaints': [
+                    {'description': complaint.description, 'notes': complaint.notes}
+                    for complaint in item.complaints.all()
+                ],
+            }
+            for item in jobcard.items.prefetch_related('complaints')
+        ]
+        expected = [
+            {
+                'item': item_data['item'],
+                'serial': item_data['serial'],
+                'config': item_data['config'],
+                'status': item_data['status'],
+                'complaints': [
+                    {'description': complaint['description'], 'notes': complaint['notes']}
+                    for complaint in item_data['complaints']
+                ],
+            }
+            for item_data in jobcard.items_data
+        ]
+        self.assertEqual(items, expected)
+        self.assertEqual([item.position for item in jobcard.items.all()], list(range(len(expected))))
+
+    def test_rows_follow_create_edit_and_status_change(self):
+        response = self.client.post(reverse('jobcard_create'), {
+            'customer': 'Walk-in',
+            'address': 'Shop road',
+            'phone': '9876543210',
+            'items[]': ['Laptop', 'Printer', 'Mouse'],
+            'serials[]': ['SN0', 'SN1', 'SN2'],
+            'configs[]': ['8GB', '', ''],
+            'status[]': ['logged', 'pending', 'logged'],
+            'complaints-0[]': ['No display', 'Loose hinge'],
+            'complaint_notes-0[]': ['Since Monday', ''],
+            'complaints-1[]': ['Paper jam'],
+            'complaints-2[]': ['Left click stuck'],
+        })
+        self.assertEqual(response.status_code, 302)
+        jobcard = JobCard.objects.get()
+        self.assertEqual(Complaint.objects.count(), 4)
+        self.assertRowsMatchItemsData(jobcard)
+
+        # Dropping the first item renumbers the remaining ones
+        response = self.client.post(reverse('jobcard_edit', args=[jobcard.pk]), {
+            'customer': 'Walk-in',
+            'address': 'Shop road',
+            'phone': '9876543210',
+            'items[]': ['Printer', 'Mouse'],
+            'serials[]': ['SN1', 'SN2'],
+            'configs[]': ['', ''],
+            'status-0': 'completed',
+            'status-1': 'logged',
+            'complaints-0[]': ['Paper jam'],
+            'complaints-1[]': ['Left click stuck', 'Scroll wheel'],
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(JobCardItem.objects.count(), 2)
+        self.assertEqual(Complaint.objects.count(), 3)
+        self.assertRowsMatchItemsData(jobcard)
+
+        JobCard.objects.set_item_status(jobcard.pk, 1, 'sent_technician')
+        self.assertRowsMatchItemsData(jobcard)
+        self.assertEqual(JobCard.objects.bulk_set_item_status([(jobcard.pk, 0, 'returned')]), [None])
+        self.assertRowsMatchItemsData(jobcard)
+
+    def test_migration_backfills_rows_from_items_data(self):
+        jobcards = [make_jobcard(index, item_count=index) for index in range(4)]
+        JobCardItem.objects.all().delete()
+
+        migration = importlib.import_module('jobcard.migrations.0011_backfill_jobcarditem_complaint')
+        with mock.patch.object(migration, 'BATCH_SIZE', 2):
+            migration.backfill_items(django_apps, None)
+
+        self.assertEqual(JobCardItem.objects.count(), 6)
+        self.assertEqual(Complaint.objects.count(), 12)
+        for jobcard in jobcards:
+            self.assertRowsMatchItemsData(jobcard)
+
+
+class JobCardAggregateTests(TestCase):
+    def test_columns_follow_items_data_and_status_updates(self):
+        jobcard = make_jobcard(1, item_count=3)
+        JobCard.objects.set_item_status(jobcard.pk, 1, 'pending')
+        jobcard = JobCard.objects.get(pk=jobcard.pk)
+        self.assertEqual((jobcard.item_count, jobcard.complaint_count), (3, 6))
+        self.assertEqual(jobcard.worst_status, 'pending')
+        self.assertEqual(jobcard.item_names, ['Laptop'] * 3)
+
+        for item_index in range(3):
+            JobCard.objects.set_item_status(jobcard.pk, item_index, 'completed')
+        self.assertEqual(JobCard.objects.filter(worst_status='completed').get(), jobcard)
+        self.assertFalse(JobCard.objects.filter(item_names__contains=['Printer']).exists())
+
+    def test_delete_summary_does_not_load_items(self):
+        jobcard = make_jobcard(1)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post(reverse('delete_ticket_by_number', args=[jobcard.ticket_no]))
+        self.assertIn('Deleted 2 item(s) with 4 complaint(s)', response.json()['message'])
+        self.assertFalse(any('"items_data"' in query['sql'] for query in context.captured_queries))
+
+
+class DashboardStatsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_counts_and_time_in_status(self):
+        first, second = make_jobcard(1), make_jobcard(2, item_count=1)
+        JobCard.objects.set_item_status(first.pk, 0, 'pending')
+        JobCard.objects.set_item_status(first.pk, 0, 'pending')
+        # first item: logged for an hour, then pending for the last two hours
+        hour_ago = timezone.now() - timedelta(hours=1)
+        ItemStatusChange.objects.filter(jobcard=first, position=0, status='logged').update(
+            changed_at=hour_ago - timedelta(hours=1),
+        )
+        ItemStatusChange.objects.filter(jobcard=first, position=0, status='pending').update(changed_at=hour_ago)
+        self.assertEqual(ItemStatusChange.objects.filter(jobcard=first).count(), 3)
+
+        with self.assertNumQueries(6):
+            stats = self.client.get(reverse('api_dashboard_stats')).json()
+        self.assertEqual(stats['total_jobcards'], 2)
+        self.assertEqual(stats['items_by_status']['pending'], 1)
+        self.assertEqual(stats['items_by_status']['logged'], 2)
+        self.assertEqual(stats['items_by_type']['Laptop'], 3)
+        self.assertEqual(stats['items_by_type']['Printer'], 0)
+        self.assertEqual(stats['jobcards_by_worst_status'], {'pending': 1, 'logged': 1})
+        self.assertEqual(stats['jobcards_per_day'], [{'date': timezone.localdate().isoformat(), 'count': 2}])
+        self.assertAlmostEqual(stats['time_in_status']['pending']['avg_seconds'], 3600, delta=60)
+        self.assertEqual(stats['time_in_status']['logged']['periods'], 3)
+
+        # Served from the cache until the short TTL expires
+        with self.assertNumQueries(0):
+            self.client.get(reverse('api_dashboard_stats'))
+
+
+class PerformanceMiddlewareTests(TestCase):
+    def setUp(self):
+        metrics.store.clear()
+        # The template timer patches Template.render process-wide; do not leak it into other tests
+        self.addCleanup(metrics.restore_templates)
+
+    @override_settings(JOBCARD_METRICS_HEADER=True, JOBCARD_METRICS_TEMPLATES=True)
+    def test_records_queries_templates_and_size_per_url_name(self):
+        for index in range(3):
+            make_jobcard(index)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse('jobcard_list'))
+        self.assertRegex(response['Server-Timing'], rf'db;dur=[\d.]+;desc="{len(context.captured_queries)} queries"')
+        self.assertIn('tpl;dur=', response['Server-Timing'])
+
+        figures = metrics.store.summary()['jobcard_list']
+        self.assertEqual(figures['count'], 1)
+        self.assertEqual(figures['queries']['p50'], len(context.captured_queries))
+        self.assertEqual(figures['response_bytes']['max'], len(response.content))
+        self.assertGreater(figures['template_ms']['p50'], 0)
+        self.assertGreaterEqual(figures['wall_ms']['p50'], figures['template_ms']['p50'])
+
+    @override_settings(JOBCARD_METRICS_HEADER=True, JOBCARD_METRICS_TEMPLATES=False)
+    def test_templates_are_left_alone_unless_enabled(self):
+        render = Template.render
+        response = self.client.get(reverse('jobcard_list'))
+        self.assertIs(Template.render, render)
+        self.assertNotIn('tpl;dur=', response['Server-Timing'])
+        self.assertIsNone(metrics.store.summary()['jobcard_list']['template_ms'])
+
+    @override_settings(JOBCARD_METRICS_TEMPLATES=True)
+    async def test_counts_queries_of_async_views(self):
+        await sync_to_async(make_jobcard)(1)
+        response = await AsyncClient().get(reverse('api_jobcard_search'), {'q': 'Customer'})
+        self.assertEqual(response.json()['count'], 1)
+        figures = metrics.store.summary()['api_jobcard_search']
+        self.assertEqual(figures['queries']['max'], 1)
+        self.assertEqual(figures['template_ms']['max'], 0)
+
+    def test_metrics_endpoint_is_staff_only(self):
+        self.client.get(reverse('api_dashboard_stats'))
+        self.assertEqual(self.client.get(reverse('api_metrics')).status_code, 403)
+
+        staff = User.objects.create_user('staff', password='x', is_staff=True)
+        self.client.force_login(staff)
+        payload = self.client.get(reverse('api_metrics')).json()
+        self.assertEqual(payload['views']['api_dashboard_stats']['count'], 1)
+        self.assertEqual(set(payload['views']['api_dashboard_stats']['wall_ms']), {'p50', 'p90', 'p99', 'max'})
+
+
+class BulkStatusUpdateTests(TestCase):
+    def post_updates(self, updates):
+        return self.client.post(
+            reverse('bulk_update_status'), {'updates': updates}, content_type='application/json',
+        )
+
+    def test_reports_per_entry_results(self):
+        jobcard = make_jobcard(1)
+        response = self.post_updates([
+            {'jobcard_id': jobcard.pk, 'item_index': 0, 'status': 'completed'},
+            {'jobcard_id': jobcard.pk, 'item_index': 1, 'status': 'pending'},
+            {'jobcard_id': jobcard.pk, 'item_index': 9, 'status': 'pending'},
+            {'jobcard_id': jobcard.pk + 1000, 'item_index': 0, 'status': 'pending'},
+            {'jobcard_id': jobcard.pk, 'item_index': 0, 'status': 'bogus'},
+            {'item_index': 0},
+        ])
+        data = response.json()
+        self.assertEqual(data['updated'], 2)
+        self.assertEqual([entry['success'] for entry in data['results']], [True, True, False, False, False, False])
+        self.assertEqual(data['results'][2]['error'], 'Item not found')
+        self.assertEqual(data['results'][3]['error'], 'Job card not found')
+
+        jobcard.refresh_from_db()
+        self.assertEqual([item['status'] for item in jobcard.items_data], ['completed', 'pending'])
+        self.assertEqual(list(jobcard.items.values_list('status', flat=True)), ['completed', 'pending'])
+
+    def test_query_count_does_not_grow_with_entries(self):
+        def count_queries(jobcards):
+            updates = [
+                {'jobcard_id': jobcard.pk, 'item_index': item_index, 'status': 'completed'}
+                for jobcard in jobcards for item_index in range(2)
+            ]
+            with CaptureQueriesContext(connection) as context:
+                self.assertEqual(self.post_updates(updates).json()['updated'], len(updates))
+            return len(context.captured_queries)
+
+        few = count_queries([make_jobcard(index) for index in range(2)])
+        many = count_queries([make_jobcard(index) for index in range(2, 22)])
+        self.assertEqual(few, many)
+
+
+class ConcurrentItemStatusTests(TransactionTestCase):
+    def test_concurrent_sibling_updates_are_not_lost(self):
+        jobcard = make_jobcard(1)
+        barrier = threading.Barrier(2)
+
+        def worker(item_index, status):
+            try:
+                barrier.wait()
+                for _ in range(10):
+                    JobCard.objects.set_item_status(jobcard.pk, item_index, status)
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=worker, args=(0, 'completed')),
+            threading.Thread(target=worker, args=(1, 'rejected')),
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        jobcard.refresh_from_db()
+        self.assertEqual([item['status'] for item in jobcard.items_data], ['completed', 'rejected'])
@@ -0,0 +1,59 @@
+import re
+
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# PostgreSQL sequence created by migration 0013. Sequences are not
+# transactional, so concurrent workers never receive the same value.
+TICKET_SEQUENCE = 'jobcard_ticket_seq'
+TICKET_PATTERN = re.compile(r'TK-(\d{9})$')
+
+
+def format_ticket_number(value):
+    """Nine digits keep sequence tickets apart from the legacy 8-character hex ones"""
+    return f"TK-{value:09d}"
+
+
+def reserve_ticket_numbers(count, using=DEFAULT_DB_ALIAS):
+    """Reserve count ticket numbers in a single round-trip"""
+    if count < 1:
+        return []
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            "SELECT nextval(%s) FROM generate_series(1, %s)",
+            [TICKET_SEQUENCE, count],
+        )
+        return [format_ticket_number(row[0]) for row in cursor.fetchall()]
+
+
+def advance_ticket_sequence(ticket_numbers, using=DEFAULT_DB_ALIAS):
+    """Move the sequence past imported sequence-style tickets so it never hands them out again.
+
+    Returns whether there were any; numbers reserved before the call may then clash.
+    """
+    values = [int(match[1]) for match in map(TICKET_PATTERN.match, ticket_numbers) if match]
+    if not values:
+        return False
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            f"SELECT setval(%s, GREATEST((SELECT last_value FROM {TICKET_SEQUENCE}), %s))",
+            [TICKET_SEQUENCE, max(values)],
+        )
+    return True
+
+
+class TicketNumberBlock:
+    """Iterator handing out ticket numbers reserved block_size at a time, for bulk imports"""
+
+    def __init__(self, block_size=500, using=DEFAULT_DB_ALIAS):
+        self.block_size = block_size
+        self.using = using
+        self._reserved = []
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if not self._reserved:
+            self._reserved = reserve_ticket_numbers(self.block_size, using=self.using)
+            self._reserved.reverse()
+        return self._reserved.pop()
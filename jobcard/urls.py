@@ -4,10 +4,22 @@ from . import views
 urlpatterns = [
    path('', views.jobcard_list, name='jobcard_list'),
     path('create/', views.jobcard_create, name='jobcard_create'),
+    path('export/', views.jobcard_export, name='jobcard_export'),
     path('edit/<int:pk>/', views.jobcard_edit, name='jobcard_edit'),
     path('update-status/<int:pk>/', views.update_status, name='update_status'),
+    path('update-status/bulk/', views.bulk_update_status, name='bulk_update_status'),
+    path('delete-tickets/', views.delete_tickets, name='delete_tickets'),
     path('delete-ticket/<str:ticket_no>/', views.delete_ticket_by_number, name='delete_ticket_by_number'),
     path('delete-jobcard/<int:pk>/', views.delete_jobcard, name='delete_jobcard'),
     # Add the API endpoint
     path('api/jobcard/<int:pk>/', views.api_jobcard_detail, name='api_jobcard_detail'),
+    path('api/jobcards/', views.api_jobcard_list, name='api_jobcard_list'),
+    path('api/jobcards/changes/', views.api_jobcard_changes, name='api_jobcard_changes'),
+    path('api/jobcards/search/', views.api_jobcard_search, name='api_jobcard_search'),
+    path('api/archive/search/', views.api_archive_search, name='api_archive_search'),
+    path('api/archive/<str:ticket_no>/', views.api_archive_detail, name='api_archive_detail'),
+    path('api/stats/', views.api_dashboard_stats, name='api_dashboard_stats'),
+    path('api/metrics/', views.api_metrics, name='api_metrics'),
+    path('api/uploads/', views.api_upload_create, name='api_upload_create'),
+    path('api/uploads/<uuid:upload_id>/', views.api_upload_detail, name='api_upload_detail'),
 ]
\ No newline at end of file
@@ -1,26 +1,293 @@
-from django.shortcuts import render, redirect, get_object_or_404
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIRequest
+from django.shortcuts import render, redirect, get_object_or_404, aget_object_or_404
+from django.template.loader import render_to_string
 from django.contrib import messages
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils import timezone
 from django.views.decorators.http import require_POST
 from django.views.decorators.csrf import csrf_exempt
-from .models import JobCard, JobCardImage
-import os
+from django.core.paginator import Paginator
+from django.db import transaction
+from django.db.models import Q
+from django.utils.cache import get_conditional_response
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.http import http_date
+from .cache import aget_cached_detail, aget_cached_version, astore_detail, jobcard_version
+from . import metrics
+from .models import ArchivedJobCard, ImageUpload, JobCard, JobCardChange, JobCardImage
+from .stats import build_dashboard_stats
+from .storage import cold_storage
+import asyncio
+import base64
+import binascii
+import csv
 import json
+import os
+import time
+from datetime import datetime, timedelta
+
+JOBCARD_PAGE_SIZE = 25
+JOBCARD_MAX_PAGE_SIZE = 100
+
+
+def parse_date_param(value):
+    """Return a date for YYYY-MM-DD query values, None for blank or invalid input"""
+    try:
+        return parse_date(value or '')
+    except ValueError:
+        return None
+
+
+def local_day_start(day):
+    return timezone.make_aware(datetime.combine(day, datetime.min.time()))
+
+
+def filter_jobcards(queryset, params):
+    """Apply the list page's search, status, item, phone and date range filters in the database"""
+    search = params.get('search', '').strip()
+    status = params.get('status', '').strip()
+    item = params.get('item', '').strip()
+    phone = params.get('phone', '').strip()
+    date_from = parse_date_param(params.get('date_from'))
+    date_to = parse_date_param(params.get('date_to'))
+
+    if search:
+        queryset = queryset.search(search)
+    if status:
+        queryset = queryset.having_items(status=status)
+    if item:
+        # items_data @> [...] is answered by jobcard_items_data_idx
+        queryset = queryset.filter(items_data__contains=[{'item': item}])
+    if phone:
+        queryset = queryset.filter(phone=phone)
+    # Plain created_at bounds (rather than __date) can use jobcard_created_at_idx
+    if date_from:
+        queryset = queryset.filter(created_at__gte=local_day_start(date_from))
+    if date_to:
+        queryset = queryset.filter(created_at__lt=local_day_start(date_to + timedelta(days=1)))
+    return queryset
+
+
+def get_page_size(params):
+    try:
+        page_size = int(params.get('page_size', JOBCARD_PAGE_SIZE))
+    except (TypeError, ValueError):
+        return JOBCARD_PAGE_SIZE
+    return max(1, min(page_size, JOBCARD_MAX_PAGE_SIZE))
+
 
 def jobcard_list(request):
-    jobcards = JobCard.objects.all()
-    
-    # Prepare data for template
-    for jobcard in jobcards:
-        # Group images by item_index
-        jobcard.images_by_item = {}
-        for image in jobcard.images.all():
-            item_index = image.item_index
-            if item_index not in jobcard.images_by_item:
-                jobcard.images_by_item[item_index] = []
-            jobcard.images_by_item[item_index].append(image)
+    # Taken before reading so the change feed replays anything committed while rendering
+    feed_cursor = get_feed_cursor()
+    jobcards = filter_jobcards(JobCard.objects.with_images(), request.GET)
+    paginator = Paginator(jobcards, get_page_size(request.GET))
+    page_obj = paginator.get_page(request.GET.get('page'))
     
-    return render(request, 'jobcard_list.html', {'jobcards': jobcards})
+    # Prepare data for template (images come from the page's single prefetch query)
+    for jobcard in page_obj:
+        jobcard.images_by_item = jobcard.get_images_by_item()
+
+    # Query string without the page number, reused by the pagination links
+    query_params = request.GET.copy()
+    query_params.pop('page', None)
+
+    context = {
+        'jobcards': page_obj,
+        'page_obj': page_obj,
+        'paginator': paginator,
+        'filters': {
+            'search': request.GET.get('search', ''),
+            'status': request.GET.get('status', ''),
+            'date_from': request.GET.get('date_from', ''),
+            'date_to': request.GET.get('date_to', ''),
+            'item': request.GET.get('item', ''),
+            'phone': request.GET.get('phone', ''),
+        },
+        'is_filtered': any(
+            request.GET.get(key) for key in ('search', 'status', 'item', 'phone', 'date_from', 'date_to')
+        ),
+        'query_string': query_params.urlencode(),
+        'feed_cursor': feed_cursor,
+        'feed_timeout': FEED_TIMEOUT if feed_long_poll_enabled() else 0,
+        'feed_refresh_interval': FEED_REFRESH_INTERVAL,
+    }
+    return render(request, 'jobcard_list.html', context)
+
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_HEADER = [
+    'Ticket No', 'Created Date', 'Customer Name', 'Phone No', 'Address',
+    'Item', 'Serial', 'Configuration', 'Status', 'Complaint', 'Notes',
+]
+
+
+class Echo:
+    """File-like object whose write() hands the row back for streaming"""
+    def write(self, value):
+        return value
+
+
+def jobcard_export_rows(jobcard, status_labels):
+    ticket = [
+        jobcard.ticket_no,
+        timezone.localtime(jobcard.created_at).strftime('%d/%m/%Y %H:%M'),
+        jobcard.customer,
+        jobcard.phone,
+        jobcard.address,
+    ]
+    pairs = list(jobcard.iter_item_complaints()) or [({}, None)]
+    for item, complaint in pairs:
+        item_name = item.get('item', '')
+        status = item.get('status', '')
+        description = (complaint or {}).get('description', '')
+        yield ticket + [
+            item_name,
+            item.get('serial', ''),
+            item.get('config', ''),
+            status_labels.get(status, status),
+            f"{item_name or 'Unknown'}: {description}" if description else '',
+            (complaint or {}).get('notes', ''),
+        ]
+
+
+def iter_export_rows(jobcards):
+    status_labels = dict(JobCard.STATUS_CHOICES)
+    yield EXPORT_HEADER
+    for jobcard in jobcards.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield from jobcard_export_rows(jobcard, status_labels)
+
+
+async def aiter_export_rows(jobcards):
+    status_labels = dict(JobCard.STATUS_CHOICES)
+    yield EXPORT_HEADER
+    async for jobcard in jobcards.aiterator(chunk_size=EXPORT_CHUNK_SIZE):
+        for row in jobcard_export_rows(jobcard, status_labels):
+            yield row
+
+
+async def astream_csv(rows):
+    writer = csv.writer(Echo())
+    async for row in rows:
+        yield writer.writerow(row)
+
+
+def jobcard_export(request):
+    """Stream the (optionally filtered) job cards as CSV, one line per item complaint.
+
+    Served through asgi.py the response gets an async iterator: Django would
+    read a sync one into a list before sending the first byte.
+    """
+    jobcards = filter_jobcards(JobCard.objects.all(), request.GET).only(
+        'ticket_no', 'created_at', 'customer', 'phone', 'address', 'items_data',
+    )
+    if isinstance(request, ASGIRequest):
+        content = astream_csv(aiter_export_rows(jobcards))
+    else:
+        writer = csv.writer(Echo())
+        content = (writer.writerow(row) for row in iter_export_rows(jobcards))
+    response = StreamingHttpResponse(content, content_type='text/csv')
+    filename = f"jobcards-{timezone.localdate():%Y%m%d}.csv"
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+def parse_items_form(post, files, edit=False):
+    """Build items_data and the uploaded images from the create/edit form in a single pass.
+
+    Returns (items_data, uploads, attached) where uploads is a list of
+    (item_index, complaint_index, file) and attached a list of
+    (item_index, complaint_index, image_id) for images sent beforehand
+    through the chunked upload API, both using positions in items_data.
+    """
+    items = post.getlist('items[]')
+    serials = post.getlist('serials[]')
+    configs = post.getlist('configs[]')
+    status_list = post.getlist('status[]')
+
+    items_data = []
+    uploads = []
+    attached = []
+
+    for idx, item_name in enumerate(items):
+        if not item_name.strip():
+            continue
+
+        serial = serials[idx] if idx < len(serials) else ''
+        config = configs[idx] if idx < len(configs) else ''
+        if edit:
+            status = post.get(f'status-{idx}', 'logged')
+        else:
+            status = status_list[idx] if idx < len(status_list) else 'logged'
+
+        # Get complaints for this item
+        complaint_descriptions = post.getlist(f'complaints-{idx}[]')
+        complaint_notes = post.getlist(f'complaint_notes-{idx}[]')
+        complaint_ids = post.getlist(f'complaint_ids-{idx}[]')
+
+        complaints = []
+        for complaint_idx, description in enumerate(complaint_descriptions):
+            if description.strip():
+                notes = complaint_notes[complaint_idx] if complaint_idx < len(complaint_notes) else ''
+                complaint = {
+                    'description': description.strip(),
+                    'notes': notes.strip()
+                }
+                if edit:
+                    complaint_id = complaint_ids[complaint_idx] if complaint_idx < len(complaint_ids) else 0
+                    complaint['id'] = int(complaint_id) if complaint_id and complaint_id != '0' else None
+                complaints.append(complaint)
+
+        # If no complaints, add a default one
+        if not complaints:
+            complaint = {
+                'description': 'General complaint',
+                'notes': ''
+            }
+            if edit:
+                complaint['id'] = None
+            complaints.append(complaint)
+
+        item_index = len(items_data)
+        items_data.append({
+            'item': item_name,
+            'serial': serial,
+            'config': config,
+            'status': status,
+            'complaints': complaints
+        })
+
+        # The edit form attaches new images to the item as a whole
+        if edit:
+            uploads.extend((item_index, 0, image) for image in files.getlist(f'new_images-{idx}[]'))
+            attached.extend(
+                (item_index, 0, int(image_id))
+                for image_id in post.getlist(f'uploaded_images-{idx}[]') if image_id.isdigit()
+            )
+        else:
+            for complaint_idx in range(len(complaints)):
+                images = files.getlist(f'images-{idx}-{complaint_idx}[]')
+                uploads.extend((item_index, complaint_idx, image) for image in images)
+                attached.extend(
+                    (item_index, complaint_idx, int(image_id))
+                    for image_id in post.getlist(f'uploaded_images-{idx}-{complaint_idx}[]') if image_id.isdigit()
+                )
+
+    return items_data, uploads, attached
+
+
+def save_uploads(jobcard, uploads):
+    """Write the uploaded images of a job card that was just saved, with a single bulk insert"""
+    return JobCardImage.objects.bulk_create_with_variants([
+        JobCardImage(
+            jobcard=jobcard,
+            image=image,
+            item_index=item_index,
+            complaint_index=complaint_index
+        )
+        for item_index, complaint_index, image in uploads
+    ], touch=False)
+
 
 @csrf_exempt
 def jobcard_create(request):
@@ -34,82 +301,19 @@ def jobcard_create(request):
             messages.error(request, "Customer name, address, and phone are required fields.")
             return redirect('jobcard_create')
 
-        # Get all items and their data
-        items = request.POST.getlist('items[]')
-        serials = request.POST.getlist('serials[]')
-        configs = request.POST.getlist('configs[]')
-        status_list = request.POST.getlist('status[]')
-        
-        # Build items_data structure
-        items_data = []
-        
-        for idx, item_name in enumerate(items):
-            if not item_name.strip():
-                continue
-                
-            serial = serials[idx] if idx < len(serials) else ''
-            config = configs[idx] if idx < len(configs) else ''
-            status = status_list[idx] if idx < len(status_list) else 'logged'
-            
-            # Get complaints for this item
-            complaint_descriptions = request.POST.getlist(f'complaints-{idx}[]')
-            complaint_notes = request.POST.getlist(f'complaint_notes-{idx}[]')
-            
-            complaints = []
-            for complaint_idx, description in enumerate(complaint_descriptions):
-                if description.strip():
-                    notes = complaint_notes[complaint_idx] if complaint_idx < len(complaint_notes) else ''
-                    complaints.append({
-                        'description': description.strip(),
-                        'notes': notes.strip()
-                    })
-            
-            # If no complaints, add a default one
-            if not complaints:
-                complaints.append({
-                    'description': 'General complaint',
-                    'notes': ''
-                })
-            
-            items_data.append({
-                'item': item_name,
-                'serial': serial,
-                'config': config,
-                'status': status,
-                'complaints': complaints
-            })
+        items_data, uploads, attached = parse_items_form(request.POST, request.FILES)
 
-        # Create single job card with all items and complaints
+        # Create single job card with all items, complaints and images
         if items_data:
-            job_card = JobCard.objects.create(
-                customer=customer,
-                address=address,
-                phone=phone,
-                items_data=items_data
-            )
-
-            # Save images with proper indexing
-            for item_idx, item_name in enumerate(items):
-                if not item_name.strip():
-                    continue
-                    
-                # Get complaints count for this item to know how many complaint indices we have
-                complaint_descriptions = request.POST.getlist(f'complaints-{item_idx}[]')
-                valid_complaints = [desc for desc in complaint_descriptions if desc.strip()]
-                
-                if not valid_complaints:
-                    valid_complaints = ['General complaint']  # Default
-                
-                # For each complaint, save images
-                for complaint_idx in range(len(valid_complaints)):
-                    images = request.FILES.getlist(f'images-{item_idx}-{complaint_idx}[]')
-                    for image in images:
-                        JobCardImage.objects.create(
-                            jobcard=job_card, 
-                            image=image,
-                            item_index=item_idx,
-                            complaint_index=complaint_idx
-                        )
+            with transaction.atomic():
+                job_card = JobCard.objects.create(
+                    customer=customer,
+                    address=address,
+                    phone=phone,
+                    items_data=items_data
+                )
+                save_uploads(job_card, uploads)
+                JobCardImage.objects.attach(job_card, attached)
 
             messages.success(request, f"Job card created successfully with {len(items_data)} items.")
         else:
@@ -118,8 +322,7 @@ def jobcard_create(request):
         return redirect('jobcard_list')
 
     # For GET request, show the form with available items
-    items = ["Mouse", "Keyboard", "CPU", "Laptop", "Desktop", "Printer", "Monitor", "Other"]
-    return render(request, 'jobcard_form.html', {'items': items})
+    return render(request, 'jobcard_form.html', {'items': JobCard.ITEM_TYPES})
 
 # Add this import at the top
 from django.views.decorators.csrf import csrf_exempt
@@ -131,15 +334,6 @@ def delete_jobcard(request, jobcard_id):
         try:
             jobcard = get_object_or_404(JobCard, pk=jobcard_id)
             
-            # Delete all associated images
-            for image in jobcard.images.all():
-                if image.image and os.path.isfile(image.image.path):
-                    try:
-                        os.remove(image.image.path)
-                    except OSError:
-                        pass
-                image.delete()
-            
             customer_name = jobcard.customer
             ticket_no = jobcard.ticket_no
             jobcard.delete()
@@ -165,16 +359,11 @@ def delete_jobcard(request, jobcard_id):
 def delete_ticket_by_number(request, ticket_no):
     """Delete job card by ticket number (same as delete_jobcard since we have single row per customer now)"""
     try:
-        jobcard = get_object_or_404(JobCard, ticket_no=ticket_no)
-        
-        # Delete all associated images
-        for image in jobcard.images.all():
-            if image.image and os.path.isfile(image.image.path):
-                try:
-                    os.remove(image.image.path)
-                except OSError:
-                    pass
-            image.delete()
+        # The summary comes from the aggregate columns; items_data is not loaded
+        jobcard = get_object_or_404(
+            JobCard.objects.only('id', 'ticket_no', 'customer', 'phone', 'item_count', 'complaint_count', 'item_names'),
+            ticket_no=ticket_no,
+        )
         
         customer_name = jobcard.customer
         customer_phone = jobcard.phone
@@ -200,11 +389,37 @@ def delete_ticket_by_number(request, ticket_no):
             "error": f"⚠ An error occurred while deleting ticket {ticket_no}: {str(e)}"
         })
 
+DELETE_TICKETS_MAX = 1000
+
+
+@require_POST
+def delete_tickets(request):
+    """Delete several job cards at once from {"ticket_nos": [...]}, in a single statement"""
+    try:
+        ticket_nos = json.loads(request.body).get('ticket_nos')
+    except (ValueError, AttributeError):
+        return JsonResponse({"success": False, "error": "Invalid JSON body"}, status=400)
+    if not isinstance(ticket_nos, list) or not ticket_nos or not all(isinstance(t, str) for t in ticket_nos):
+        return JsonResponse({"success": False, "error": "ticket_nos must be a non-empty list"}, status=400)
+    if len(ticket_nos) > DELETE_TICKETS_MAX:
+        return JsonResponse({
+            "success": False,
+            "error": f"At most {DELETE_TICKETS_MAX} tickets can be deleted per request"
+        }, status=400)
+
+    deleted = JobCard.objects.filter(ticket_no__in=ticket_nos).delete_with_files()
+    deleted_tickets = set(deleted.values())
+    return JsonResponse({
+        "success": True,
+        "deleted": sorted(deleted_tickets),
+        "not_found": sorted(set(ticket_nos) - deleted_tickets),
+        "message": f"Deleted {len(deleted_tickets)} job card(s)",
+    })
+
 @csrf_exempt
 def jobcard_edit(request, pk):
-    jobcard = get_object_or_404(JobCard, pk=pk)
-    
     if request.method == 'POST':
+        jobcard = get_object_or_404(JobCard, pk=pk)
         try:
             # Get customer info from form
             customer = request.POST.get('customer', '').strip()
@@ -217,94 +432,23 @@ def jobcard_edit(request, pk):
                 return redirect('jobcard_edit', pk=pk)
 
             # Keep track of images to preserve
-            keep_images = set(request.POST.getlist('keep_images[]'))
-            
-            # Delete existing images that are not being kept
-            for image in jobcard.images.all():
-                if str(image.id) not in keep_images:
-                    if image.image and os.path.isfile(image.image.path):
-                        try:
-                            os.remove(image.image.path)
-                        except OSError:
-                            pass
-                    image.delete()
-
-            # Get all items and their data from the form
-            items = request.POST.getlist('items[]')
-            serials = request.POST.getlist('serials[]')
-            configs = request.POST.getlist('configs[]')
-            
-            # Get status for each item
-            status_list = []
-            for idx in range(len(items)):
-                status_key = f'status-{idx}'
-                status = request.POST.get(status_key, 'logged')
-                status_list.append(status)
-            
-            # Build new items_data structure
-            items_data = []
-            
-            for idx, item_name in enumerate(items):
-                if not item_name.strip():
-                    continue
-                    
-                serial = serials[idx] if idx < len(serials) else ''
-                config = configs[idx] if idx < len(configs) else ''
-                status = status_list[idx] if idx < len(status_list) else 'logged'
-                
-                # Get complaints for this item
-                complaint_descriptions = request.POST.getlist(f'complaints-{idx}[]')
-                complaint_notes = request.POST.getlist(f'complaint_notes-{idx}[]')
-                complaint_ids = request.POST.getlist(f'complaint_ids-{idx}[]')
-                
-                complaints = []
-                for complaint_idx, description in enumerate(complaint_descriptions):
-                    if description.strip():
-                        notes = complaint_notes[complaint_idx] if complaint_idx < len(complaint_notes) else ''
-                        complaint_id = complaint_ids[complaint_idx] if complaint_idx < len(complaint_ids) else 0
-                        complaints.append({
-                            'description': description.strip(),
-                            'notes': notes.strip(),
-                            'id': int(complaint_id) if complaint_id and complaint_id != '0' else None
-                        })
-                
-                # If no complaints, add a default one
-                if not complaints:
-                    complaints.append({
-                        'description': 'General complaint',
-                        'notes': '',
-                        'id': None
-                    })
-                
-                items_data.append({
-                    'item': item_name,
-                    'serial': serial,
-                    'config': config,
-                    'status': status,
-                    'complaints': complaints
-                })
+            keep_images = {int(image_id) for image_id in request.POST.getlist('keep_images[]') if image_id.isdigit()}
+
+            items_data, uploads, attached = parse_items_form(request.POST, request.FILES, edit=True)
+
+            with transaction.atomic():
+                # Delete existing images that are not being kept
+                jobcard.images.exclude(pk__in=keep_images).delete_with_files()
+
+                # Update the job card
+                jobcard.customer = customer
+                jobcard.address = address
+                jobcard.phone = phone
+                jobcard.items_data = items_data
+                jobcard.save()
 
-            # Update the job card
-            jobcard.customer = customer
-            jobcard.address = address
-            jobcard.phone = phone
-            jobcard.items_data = items_data
-            jobcard.save()
-
-            # Handle new images for each item
-            for item_idx, item_name in enumerate(items):
-                if not item_name.strip():
-                    continue
-                    
-                # Handle new images for this item
-                new_images = request.FILES.getlist(f'new_images-{item_idx}[]')
-                for image in new_images:
-                    JobCardImage.objects.create(
-                        jobcard=jobcard, 
-                        image=image,
-                        item_index=item_idx,
-                        complaint_index=0  # All images for the item
-                    )
+                save_uploads(jobcard, uploads)
+                JobCardImage.objects.attach(jobcard, attached)
 
             messages.success(request, f"Job card {jobcard.ticket_no} updated successfully with {len(items_data)} items.")
             return redirect('jobcard_list')
@@ -314,19 +458,23 @@ def jobcard_edit(request, pk):
             return redirect('jobcard_edit', pk=pk)
     
     # For GET request, prepare data for the edit form
+    jobcard = get_object_or_404(JobCard.objects.with_images(), pk=pk)
     items = []
     
     if jobcard.items_data:
+        images_by_item = jobcard.get_images_by_item()
         for item_idx, item_data in enumerate(jobcard.items_data):
             # Get ALL images for this item (regardless of complaint_index)
-            item_images = list(jobcard.images.filter(item_index=item_idx).values('id', 'image'))
-            
-            # Convert image paths to URLs
-            for img in item_images:
-                if img['image']:
-                    img['url'] = f"/media/{img['image']}"
-                else:
-                    img['url'] = ''
+            item_images = [
+                {
+                    'id': img.id,
+                    'image': img.image.name,
+                    'url': img.image.url if img.image else '',
+                    'thumbnail_url': img.thumbnail_url if img.image else '',
+                    'medium_url': img.medium_url if img.image else '',
+                }
+                for img in images_by_item.get(item_idx, [])
+            ]
             
             # Build complaints list
             complaints = []
@@ -378,77 +526,590 @@ def jobcard_edit(request, pk):
     return render(request, 'jobcard_edit.html', context)
 
 @csrf_exempt
-def update_status(request, pk):
+async def update_status(request, pk):
     if request.method == 'POST':
         try:
             data = json.loads(request.body)
             status = data.get('status')
-            item_index = data.get('item_index', 0)  # Which item to update
-            
-            jobcard = JobCard.objects.get(pk=pk)
-            
-            # Update status for specific item
-            if jobcard.items_data and item_index < len(jobcard.items_data):
-                jobcard.items_data[item_index]['status'] = status
-                jobcard.save()
-                
+            item_index = int(data.get('item_index', 0))  # Which item to update
+
+            if status not in dict(JobCard.STATUS_CHOICES):
+                return JsonResponse({"success": False, "error": f"Invalid status: {status}"}, status=400)
+
+            # Update status for specific item without rewriting the rest of the row
+            if item_index >= 0 and await JobCard.objects.aset_item_status(pk, item_index, status):
                 return JsonResponse({
                     "success": True, 
                     "status": dict(JobCard.STATUS_CHOICES).get(status, status)
                 })
+            elif not await JobCard.objects.filter(pk=pk).aexists():
+                return JsonResponse({"success": False, "error": "Job card not found"}, status=404)
             else:
                 return JsonResponse({"success": False, "error": "Item not found"}, status=404)
                 
-        except JobCard.DoesNotExist:
-            return JsonResponse({"success": False, "error": "Job card not found"}, status=404)
         except Exception as e:
             return JsonResponse({"success": False, "error": str(e)}, status=400)
     return JsonResponse({"success": False, "error": "Invalid request"}, status=400)
 
+BULK_STATUS_MAX_UPDATES = 1000
+
+
 @csrf_exempt
-def api_jobcard_detail(request, pk):
+def bulk_update_status(request):
+    """Set many item statuses at once from {"updates": [{"jobcard_id", "item_index", "status"}, ...]}"""
+    if request.method != 'POST':
+        return JsonResponse({"success": False, "error": "Invalid request"}, status=400)
+
+    try:
+        entries = json.loads(request.body).get('updates')
+    except (ValueError, AttributeError):
+        return JsonResponse({"success": False, "error": "Invalid JSON body"}, status=400)
+    if not isinstance(entries, list) or not entries:
+        return JsonResponse({"success": False, "error": "updates must be a non-empty list"}, status=400)
+    if len(entries) > BULK_STATUS_MAX_UPDATES:
+        return JsonResponse({
+            "success": False,
+            "error": f"At most {BULK_STATUS_MAX_UPDATES} updates are allowed per request"
+        }, status=400)
+
+    results = [None] * len(entries)
+    updates = []
+    positions = []
+    for position, entry in enumerate(entries):
+        try:
+            updates.append((int(entry['jobcard_id']), int(entry.get('item_index', 0)), entry['status']))
+            positions.append(position)
+        except (KeyError, TypeError, ValueError, AttributeError):
+            results[position] = "Each update needs jobcard_id, item_index and status"
+
+    try:
+        errors = JobCard.objects.bulk_set_item_status(updates)
+    except Exception as e:
+        return JsonResponse({"success": False, "error": str(e)}, status=400)
+    for position, error in zip(positions, errors):
+        results[position] = error
+
+    report = [
+        {
+            "jobcard_id": entry.get('jobcard_id') if isinstance(entry, dict) else None,
+            "item_index": entry.get('item_index', 0) if isinstance(entry, dict) else None,
+            "success": error is None,
+            **({"error": error} if error else {}),
+        }
+        for entry, error in zip(entries, results)
+    ]
+    updated = sum(1 for error in results if error is None)
+    return JsonResponse({
+        "success": updated == len(entries),
+        "updated": updated,
+        "failed": len(entries) - updated,
+        "results": report,
+    })
+
+def jobcard_detail_payload(jobcard):
+    """Detail API representation; expects images prefetched with with_images()"""
+    images_by_complaint = {
+        key: [
+            {
+                'id': img.id,
+                'url': img.image.url,
+                'thumbnail_url': img.thumbnail_url,
+                'medium_url': img.medium_url,
+            }
+            for img in images
+        ]
+        for key, images in jobcard.get_images_by_complaint().items()
+    } if jobcard.items_data else {}
+    return {
+        'ticket_no': jobcard.ticket_no,
+        'customer': jobcard.customer,
+        'address': jobcard.address,
+        'phone': jobcard.phone,
+        'items': items_payload(jobcard.items_data, images_by_complaint),
+    }
+
+
+def items_payload(items_data, images_by_complaint):
+    """Items with their complaints; images_by_complaint maps (item_index, complaint_index) to image payloads"""
+    items = []
+    for item_idx, item_data in enumerate(items_data or []):
+        # Build complaints with images
+        complaints = []
+        for complaint_idx, complaint in enumerate(item_data.get('complaints', [])):
+            complaints.append({
+                'description': complaint.get('description', ''),
+                'notes': complaint.get('notes', ''),
+                'images': images_by_complaint.get((item_idx, complaint_idx), []),
+            })
+
+        items.append({
+            'name': item_data.get('item', ''),
+            'serial': item_data.get('serial', ''),
+            'config': item_data.get('config', ''),
+            'status': item_data.get('status', 'logged'),
+            'complaints': complaints
+        })
+    return items
+
+
+@csrf_exempt
+async def api_jobcard_detail(request, pk):
     if request.method == 'GET':
         try:
-            jobcard = get_object_or_404(JobCard, pk=pk)
-            
-            data = {
+            # Answer polling clients from the cached version without querying the database
+            version = await aget_cached_version(pk)
+            data = None
+            if version is not None:
+                etag = f'"{pk}-{version}"'
+                last_modified = version // 1_000_000
+                not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+                if not_modified is not None:
+                    not_modified['ETag'] = etag
+                    return not_modified
+                data = await aget_cached_detail(pk, version)
+
+            if data is None:
+                jobcard = await aget_object_or_404(JobCard.objects.with_images(), pk=pk)
+                version = jobcard_version(jobcard)
+                data = jobcard_detail_payload(jobcard)
+                await astore_detail(pk, version, data)
+
+            response = JsonResponse(data)
+            response['ETag'] = f'"{pk}-{version}"'
+            response['Last-Modified'] = http_date(version // 1_000_000)
+            response['Cache-Control'] = 'private, no-cache'
+            return get_conditional_response(
+                request, etag=response['ETag'], last_modified=version // 1_000_000, response=response,
+            )
+        except Exception as e:
+            return JsonResponse({'error': str(e)}, status=500)
+
+SEARCH_RESULTS_LIMIT = 20
+
+
+@csrf_exempt
+async def api_jobcard_search(request):
+    """Ranked full-text search over customers, phones, tickets, items and complaints"""
+    if request.method != 'GET':
+        return JsonResponse({'error': 'Invalid request'}, status=400)
+
+    query = request.GET.get('q', '').strip()
+    if not query:
+        return JsonResponse({'error': 'Query parameter q is required'}, status=400)
+
+    try:
+        limit = int(request.GET.get('limit', SEARCH_RESULTS_LIMIT))
+    except ValueError:
+        limit = SEARCH_RESULTS_LIMIT
+    limit = max(1, min(limit, JOBCARD_MAX_PAGE_SIZE))
+
+    try:
+        jobcards = (
+            JobCard.objects.search(query)
+            .only('id', 'ticket_no', 'customer', 'phone', 'items_data', 'created_at')
+            .order_by('-rank', '-created_at')[:limit]
+        )
+        results = [
+            {
+                'id': jobcard.pk,
                 'ticket_no': jobcard.ticket_no,
                 'customer': jobcard.customer,
-                'address': jobcard.address,
                 'phone': jobcard.phone,
-                'items': []
+                'items': jobcard.get_items_list(),
+                'created_at': jobcard.created_at.isoformat(),
+                'rank': round(jobcard.rank, 4),
             }
-            
-            if jobcard.items_data:
-                for item_idx, item_data in enumerate(jobcard.items_data):
-                    # Get images for this item
-                    item_images = {}
-                    for img in jobcard.images.filter(item_index=item_idx):
-                        complaint_idx = img.complaint_index
-                        if complaint_idx not in item_images:
-                            item_images[complaint_idx] = []
-                        item_images[complaint_idx].append({
-                            'id': img.id,
-                            'url': img.image.url
-                        })
-                    
-                    # Build complaints with images
-                    complaints = []
-                    for complaint_idx, complaint in enumerate(item_data.get('complaints', [])):
-                        complaints.append({
-                            'description': complaint.get('description', ''),
-                            'notes': complaint.get('notes', ''),
-                            'images': item_images.get(complaint_idx, [])
-                        })
-                    
-                    data['items'].append({
-                        'name': item_data.get('item', ''),
-                        'serial': item_data.get('serial', ''),
-                        'config': item_data.get('config', ''),
-                        'status': item_data.get('status', 'logged'),
-                        'complaints': complaints
-                    })
-            
-            return JsonResponse(data)
-        except Exception as e:
-            return JsonResponse({'error': str(e)}, status=500)
\ No newline at end of file
+            async for jobcard in jobcards
+        ]
+        return JsonResponse({'query': query, 'count': len(results), 'results': results})
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+
+ARCHIVE_DETAIL_MAX_AGE = 24 * 60 * 60
+
+
+def archived_detail_payload(archived):
+    """Detail API representation of an archived job card, images served from cold storage"""
+    images_by_complaint = {
+        key: [
+            {
+                'url': cold_storage.url(img['image']),
+                'thumbnail_url': cold_storage.url(img['thumbnail'] or img['image']),
+                'medium_url': cold_storage.url(img['medium'] or img['image']),
+            }
+            for img in images
+        ]
+        for key, images in archived.get_images_by_complaint().items()
+    }
+    return {
+        'ticket_no': archived.ticket_no,
+        'customer': archived.customer,
+        'address': archived.address,
+        'phone': archived.phone,
+        'archived': True,
+        'created_at': archived.created_at.isoformat(),
+        'updated_at': archived.updated_at.isoformat(),
+        'archived_at': archived.archived_at.isoformat(),
+        'items': items_payload(archived.items_data, images_by_complaint),
+        'status_history': archived.status_history,
+    }
+
+
+@csrf_exempt
+async def api_archive_search(request):
+    """Full-text search over archived job cards; date_from/date_to limit the partitions scanned"""
+    if request.method != 'GET':
+        return JsonResponse({'error': 'Invalid request'}, status=400)
+
+    query = request.GET.get('q', '').strip()
+    if not query:
+        return JsonResponse({'error': 'Query parameter q is required'}, status=400)
+
+    try:
+        limit = int(request.GET.get('limit', SEARCH_RESULTS_LIMIT))
+    except ValueError:
+        limit = SEARCH_RESULTS_LIMIT
+    limit = max(1, min(limit, JOBCARD_MAX_PAGE_SIZE))
+
+    archived = ArchivedJobCard.objects.search(query)
+    # Plain created_at bounds (rather than __date) let PostgreSQL prune partitions
+    date_from = parse_date_param(request.GET.get('date_from'))
+    date_to = parse_date_param(request.GET.get('date_to'))
+    if date_from:
+        archived = archived.filter(created_at__gte=local_day_start(date_from))
+    if date_to:
+        archived = archived.filter(created_at__lt=local_day_start(date_to + timedelta(days=1)))
+
+    try:
+        archived = (
+            archived.only('id', 'ticket_no', 'customer', 'phone', 'item_names', 'created_at', 'archived_at')
+            .order_by('-rank', '-created_at')[:limit]
+        )
+        results = [
+            {
+                'id': jobcard.pk,
+                'ticket_no': jobcard.ticket_no,
+                'customer': jobcard.customer,
+                'phone': jobcard.phone,
+                'items': jobcard.get_items_list(),
+                'created_at': jobcard.created_at.isoformat(),
+                'archived_at': jobcard.archived_at.isoformat(),
+                'rank': round(jobcard.rank, 4),
+            }
+            async for jobcard in archived
+        ]
+        return JsonResponse({'query': query, 'count': len(results), 'results': results})
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+
+
+async def api_archive_detail(request, ticket_no):
+    if request.method != 'GET':
+        return JsonResponse({'error': 'Invalid request'}, status=400)
+    archived = await ArchivedJobCard.objects.filter(ticket_no=ticket_no).afirst()
+    if archived is None:
+        return JsonResponse({'error': 'Archived job card not found'}, status=404)
+    response = JsonResponse(archived_detail_payload(archived))
+    # Archived job cards no longer change
+    response['Cache-Control'] = f'private, max-age={ARCHIVE_DETAIL_MAX_AGE}'
+    return response
+
+LIST_API_FIELDS = (
+    'id', 'ticket_no', 'customer', 'address', 'phone', 'items_data',
+    'item_count', 'complaint_count', 'worst_status', 'item_names', 'created_at', 'updated_at',
+)
+
+
+def encode_cursor(created_at, pk):
+    value = json.dumps([created_at.isoformat(), pk])
+    return base64.urlsafe_b64encode(value.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """(created_at, id) of the last row of the previous page; ValueError if malformed"""
+    try:
+        created_at, pk = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        created_at = parse_datetime(created_at)
+    except (TypeError, ValueError, binascii.Error) as e:
+        raise ValueError('Invalid cursor') from e
+    if created_at is None or not isinstance(pk, int):
+        raise ValueError('Invalid cursor')
+    return created_at, pk
+
+
+def parse_list_fields(value):
+    """Requested fields in LIST_API_FIELDS order (id is always included); ValueError on unknown names"""
+    if not value:
+        return LIST_API_FIELDS
+    requested = {name.strip() for name in value.split(',') if name.strip()}
+    unknown = requested.difference(LIST_API_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    return tuple(name for name in LIST_API_FIELDS if name == 'id' or name in requested)
+
+
+def serialize_list_row(values):
+    return {
+        name: value.isoformat() if name in ('created_at', 'updated_at') else value
+        for name, value in values.items()
+    }
+
+
+@csrf_exempt
+async def api_jobcard_list(request):
+    """Job cards newest first, paginated by a (created_at, id) keyset cursor.
+
+    Accepts the list page filters plus fields= (comma separated) and
+    updated_since= (ISO datetime) for incremental sync.
+    """
+    if request.method != 'GET':
+        return JsonResponse({'error': 'Invalid request'}, status=400)
+
+    try:
+        fields = parse_list_fields(request.GET.get('fields', ''))
+        cursor = request.GET.get('cursor')
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    updated_since = request.GET.get('updated_since')
+    if updated_since:
+        updated_since = parse_datetime(updated_since.replace(' ', '+'))
+        if updated_since is None:
+            return JsonResponse({'error': 'updated_since must be an ISO 8601 datetime'}, status=400)
+        if timezone.is_naive(updated_since):
+            updated_since = timezone.make_aware(updated_since)
+
+    limit = get_page_size(request.GET)
+    jobcards = filter_jobcards(JobCard.objects.all(), request.GET)
+    if updated_since:
+        jobcards = jobcards.filter(updated_at__gte=updated_since)
+    if after:
+        created_at, pk = after
+        jobcards = jobcards.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk))
+
+    # The cursor needs created_at even when the caller did not ask for it
+    columns = set(fields) | {'created_at'}
+    rows = [row async for row in jobcards.order_by('-created_at', '-id').values(*columns)[:limit + 1]]
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    next_cursor = encode_cursor(rows[-1]['created_at'], rows[-1]['id']) if has_more else None
+    results = [serialize_list_row({name: row[name] for name in fields}) for row in rows]
+    return JsonResponse({'count': len(results), 'next_cursor': next_cursor, 'results': results})
+
+
+FEED_TIMEOUT = 25
+FEED_MAX_TIMEOUT = 55
+FEED_POLL_INTERVAL = 2
+FEED_MAX_CHANGES = 200
+# Seconds between polls when long polling is off (see JOBCARD_FEED_LONG_POLL)
+FEED_REFRESH_INTERVAL = 10
+
+
+def feed_long_poll_enabled():
+    """Waiting polls only make sense under ASGI; under WSGI each one would hold a worker"""
+    return getattr(settings, 'JOBCARD_FEED_LONG_POLL', False)
+
+
+def get_feed_cursor():
+    """Change feed position: changes from transactions below it have all been handed out.
+
+    It is the oldest transaction still running, so a slow write (a create
+    saving large photos, say) holds the cursor back until it commits rather
+    than being skipped.
+    """
+    return JobCardChange.objects.horizon()
+
+
+async def collect_changes(since, until):
+    """Changes by transactions in [since, until) as feed entries, or None if there are more than FEED_MAX_CHANGES"""
+    log = [
+        change async for change in JobCardChange.objects
+        .filter(change_xid__gte=since, change_xid__lt=until)
+        .order_by('change_xid', 'jobcard_id')[:FEED_MAX_CHANGES + 1]
+    ]
+    if len(log) > FEED_MAX_CHANGES:
+        return None
+    jobcards = {
+        jobcard.pk: jobcard async for jobcard in JobCard.objects.with_images()
+        .filter(pk__in=[change.jobcard_id for change in log if not change.deleted])
+    }
+
+    changes = []
+    for change in log:
+        jobcard = jobcards.get(change.jobcard_id)
+        # Also covers a job card deleted after the log was read
+        if jobcard is None:
+            changes.append({
+                'type': 'deleted',
+                'id': change.jobcard_id,
+                'ticket_no': change.ticket_no,
+                'at': change.changed_at.isoformat(),
+            })
+            continue
+        changes.append({
+            'type': 'created' if change.created_xid >= since else 'updated',
+            'id': jobcard.pk,
+            'ticket_no': jobcard.ticket_no,
+            'at': change.changed_at.isoformat(),
+            'html': render_to_string('jobcard_row.html', {'jobcard': jobcard}),
+        })
+    return changes
+
+
+async def has_changes(since, until):
+    return await JobCardChange.objects.filter(change_xid__gte=since, change_xid__lt=until).aexists()
+
+
+async def api_jobcard_changes(request):
+    """Long-poll for job cards created, updated or deleted after cursor.
+
+    Waits up to timeout seconds for a change, then answers with the changes
+    (created/updated rows carry their rendered list row) and the cursor to
+    pass next time. reset=true means too much changed; reload instead.
+    Waiting does not hold a thread when served through asgi.py; unless
+    JOBCARD_FEED_LONG_POLL says so, polls are answered right away.
+    """
+    if request.method != 'GET':
+        return JsonResponse({'error': 'Invalid request'}, status=400)
+
+    try:
+        cursor = int(request.GET['cursor'])
+    except (KeyError, ValueError):
+        return JsonResponse({'error': 'cursor is required'}, status=400)
+    if cursor < 0:
+        return JsonResponse({'error': 'cursor is required'}, status=400)
+    try:
+        timeout = float(request.GET.get('timeout', FEED_TIMEOUT))
+    except ValueError:
+        timeout = FEED_TIMEOUT
+    if not feed_long_poll_enabled():
+        timeout = 0
+    deadline = time.monotonic() + max(0, min(timeout, FEED_MAX_TIMEOUT))
+
+    while True:
+        next_cursor = max(cursor, await sync_to_async(get_feed_cursor)())
+        if await has_changes(cursor, next_cursor):
+            break
+        if time.monotonic() >= deadline:
+            return JsonResponse({'reset': False, 'cursor': next_cursor, 'changes': []})
+        await asyncio.sleep(FEED_POLL_INTERVAL)
+
+    changes = await collect_changes(cursor, next_cursor)
+    if changes is None:
+        return JsonResponse({'reset': True, 'cursor': next_cursor, 'changes': []})
+    return JsonResponse({'reset': False, 'cursor': next_cursor, 'changes': changes})
+
+
+STATS_DAYS = 30
+STATS_MAX_DAYS = 366
+STATS_CACHE_TIMEOUT = 60
+
+
+async def api_dashboard_stats(request):
+    """Status, item type, per-day and time-in-status figures; cached for a short while per days= window"""
+    if request.method != 'GET':
+        return JsonResponse({'error': 'Invalid request'}, status=400)
+
+    try:
+        days = int(request.GET.get('days', STATS_DAYS))
+    except ValueError:
+        days = STATS_DAYS
+    days = max(1, min(days, STATS_MAX_DAYS))
+
+    key = f'jobcard:stats:{days}'
+    data = await cache.aget(key)
+    if data is None:
+        data = await sync_to_async(build_dashboard_stats)(days)
+        await cache.aset(key, data, getattr(settings, 'JOBCARD_STATS_CACHE_TIMEOUT', STATS_CACHE_TIMEOUT))
+    return JsonResponse(data)
+
+
+def api_metrics(request):
+    """Rolling request timing percentiles per URL name, as recorded by PerformanceMiddleware"""
+    if request.method != 'GET':
+        return JsonResponse({'error': 'Invalid request'}, status=400)
+    if not (settings.DEBUG or request.user.is_staff):
+        return JsonResponse({'error': 'Staff only'}, status=403)
+    return JsonResponse({
+        'window': metrics.store.get_window(),
+        'percentiles': list(metrics.PERCENTILES),
+        'views': metrics.store.summary(),
+    })
+
+UPLOAD_MAX_SIZE = 50 * 1024 * 1024
+UPLOAD_MAX_CHUNK_SIZE = 8 * 1024 * 1024
+
+
+def upload_payload(upload):
+    return {
+        'id': str(upload.pk),
+        'filename': upload.filename,
+        'size': upload.size,
+        'offset': upload.offset,
+        'complete': upload.image_id is not None,
+        'image_id': upload.image_id,
+    }
+
+
+@csrf_exempt
+def api_upload_create(request):
+    """Start a resumable upload from {"filename": ..., "size": ...}"""
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Invalid request'}, status=400)
+    try:
+        data = json.loads(request.body)
+        filename = os.path.basename(str(data['filename'])).strip()
+        size = int(data['size'])
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({'error': 'filename and size are required'}, status=400)
+    if not filename or not 0 < size <= UPLOAD_MAX_SIZE:
+        return JsonResponse({'error': f'size must be between 1 and {UPLOAD_MAX_SIZE} bytes'}, status=400)
+
+    upload = ImageUpload.objects.create(filename=filename[:255], size=size)
+    return JsonResponse(upload_payload(upload), status=201)
+
+
+@csrf_exempt
+def api_upload_detail(request, upload_id):
+    """GET the resume offset, PATCH the next chunk (Upload-Offset header + raw bytes), DELETE to cancel"""
+    if request.method == 'GET':
+        upload = get_object_or_404(ImageUpload, pk=upload_id)
+        return JsonResponse(upload_payload(upload))
+
+    if request.method == 'DELETE':
+        upload = get_object_or_404(ImageUpload, pk=upload_id)
+        if upload.image_id is not None:
+            return JsonResponse({'error': 'Upload already completed'}, status=409)
+        upload.discard()
+        return JsonResponse({'success': True})
+
+    if request.method not in ('PATCH', 'PUT'):
+        return JsonResponse({'error': 'Invalid request'}, status=400)
+
+    try:
+        offset = int(request.headers.get('Upload-Offset', ''))
+        length = int(request.META.get('CONTENT_LENGTH') or 0)
+    except ValueError:
+        return JsonResponse({'error': 'Upload-Offset and Content-Length headers are required'}, status=400)
+
+    with transaction.atomic():
+        upload = get_object_or_404(ImageUpload.objects.select_for_update(), pk=upload_id)
+        if upload.image_id is not None:
+            return JsonResponse(upload_payload(upload), status=409)
+        if offset != upload.offset:
+            # The client resumes from the offset we report
+            return JsonResponse({**upload_payload(upload), 'error': 'Offset mismatch'}, status=409)
+        if length <= 0 or length > UPLOAD_MAX_CHUNK_SIZE or offset + length > upload.size:
+            return JsonResponse({**upload_payload(upload), 'error': 'Invalid chunk size'}, status=400)
+
+        upload.write_chunk(request, length)
+        if upload.is_complete:
+            try:
+                upload.assemble()
+            except ValueError as e:
+                upload.discard()
+                return JsonResponse({'error': str(e)}, status=400)
+
+    return JsonResponse(upload_payload(upload))
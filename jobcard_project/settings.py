@@ -37,10 +37,12 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'jobcard',
 ]
 
 MIDDLEWARE = [
+    'jobcard.middleware.PerformanceMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -135,6 +137,39 @@ MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
 
+# Background tasks (image variants, file deletion)
+# 'thread' runs them in-process after commit, 'worker' leaves them for
+# `manage.py run_tasks`, 'sync' runs them inline after commit.
+JOBCARD_TASK_MODE = 'thread'
+JOBCARD_TASK_THREADS = 2
+
+# Detail API payloads are cached per job card version (see jobcard/cache.py).
+# Use a shared backend such as Redis when running several worker processes.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+JOBCARD_DETAIL_CACHE_TIMEOUT = 60 * 60
+JOBCARD_STATS_CACHE_TIMEOUT = 60
+
+# The list page's change feed long-polls (one open request per tab) only when
+# this is on. Enable it only when serving through asgi.py: under WSGI every
+# waiting poll holds a worker, so the page polls every few seconds instead.
+JOBCARD_FEED_LONG_POLL = False
+
+# `manage.py archive_jobcards` moves closed job cards idle for this long out of
+# the hot table; their images go to JOBCARD_COLD_MEDIA_ROOT (default MEDIA_ROOT/cold)
+JOBCARD_ARCHIVE_AFTER_DAYS = 365
+
+# PerformanceMiddleware keeps this many samples per URL name for api/metrics/;
+# JOBCARD_METRICS_HEADER adds a Server-Timing header to every response.
+# Set JOBCARD_METRICS_TEMPLATES to time template rendering (it wraps
+# Template.render); unset, it follows DEBUG at run time.
+JOBCARD_METRICS_WINDOW = 500
+JOBCARD_METRICS_HEADER = DEBUG
+
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 